@@ -1,3 +1,7 @@
+from collections.abc import MutableSet
+from itertools import groupby
+
+
 class Variable():
 
     ACROSS = "across"
@@ -35,6 +39,117 @@ class Variable():
         return f"Variable({self.i}, {self.j}, {direction}, {self.length})"
 
 
+class WordIndex():
+    """
+    A vocabulary numbered by length and then alphabetically, so that
+    sets of its words can be stored as bitsets: ints in which bit k is
+    set if word k is in the set.
+    """
+
+    def __init__(self, words):
+        self.words = sorted(words, key=lambda word: (len(word), word))
+        self.ids = {word: k for k, word in enumerate(self.words)}
+
+        # Words of each length, and for each (length, position), the words
+        # of that length with each letter in that position
+        self.lengths = dict()
+        self.letters = dict()
+        start = 0
+        for length, group in groupby(self.words, len):
+            group = list(group)
+            self.lengths[length] = ((1 << len(group)) - 1) << start
+            for position in range(length):
+                # Build each bitset as a string of binary digits, with the
+                # group's first word as the lowest bit
+                digits = dict()
+                for k, word in enumerate(group):
+                    letter = word[position]
+                    if letter not in digits:
+                        digits[letter] = bytearray(b"0" * len(group))
+                    digits[letter][len(group) - 1 - k] = ord("1")
+                self.letters[length, position] = {
+                    letter: int(bits, 2) << start
+                    for letter, bits in digits.items()
+                }
+            start += len(group)
+
+    def of_length(self, length):
+        """Return the bitset of words with `length` letters."""
+        return self.lengths.get(length, 0)
+
+    def with_letter(self, length, position, letter):
+        """
+        Return the bitset of words with `length` letters that have
+        `letter` at index `position`.
+        """
+        return self.letters.get((length, position), {}).get(letter, 0)
+
+    def domain(self, words=None):
+        """
+        Return a Domain of `words`, or of the whole vocabulary if None.
+        """
+        if words is None:
+            return Domain(self, (1 << len(self.words)) - 1)
+        domain = Domain(self, 0)
+        domain |= words
+        return domain
+
+
+class Domain(MutableSet):
+    """A set of words from a WordIndex, stored as a bitset."""
+
+    def __init__(self, index, bits):
+        self.index = index
+        self.bits = bits
+
+    def __contains__(self, word):
+        k = self.index.ids.get(word)
+        return k is not None and (self.bits >> k) & 1 == 1
+
+    def __iter__(self):
+        # Find the set bits in the bitset's binary digits, lowest first
+        digits = bin(self.bits)[:1:-1]
+        k = digits.find("1")
+        while k >= 0:
+            yield self.index.words[k]
+            k = digits.find("1", k + 1)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __repr__(self):
+        return f"Domain({set(self)!r})"
+
+    def add(self, word):
+        self.bits |= 1 << self.index.ids[word]
+
+    def discard(self, word):
+        k = self.index.ids.get(word)
+        if k is not None:
+            self.bits &= ~(1 << k)
+
+    def copy(self):
+        return Domain(self.index, self.bits)
+
+    def keep(self, bits):
+        """
+        Remove every word not in the bitset `bits`.
+        Return True if any word was removed.
+        """
+        kept = self.bits & bits
+        if kept == self.bits:
+            return False
+        self.bits = kept
+        return True
+
+
+class Overlaps(dict):
+    """Overlaps between pairs of variables, None for pairs not stored."""
+
+    def __missing__(self, key):
+        return None
+
+
 class Crossword():
 
     def __init__(self, structure_file, words_file):
@@ -57,9 +172,10 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
+        # Save vocabulary list, and index it by letter positions
         with open(words_file) as f:
             self.words = set(f.read().upper().splitlines())
+        self.index = WordIndex(self.words)
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +224,30 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored; others are looked up as None
+        self.overlaps = Overlaps()
+
+        # For each variable, a list of (neighbor, i, j) for each variable
+        # it overlaps, where its ith character overlaps the neighbor's jth
+        self.adjacency = {var: [] for var in self.variables}
+
+        # Find the variables crossing at each cell, rather than comparing
+        # every pair of variables
+        cells = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                cells.setdefault(cell, []).append((var, k))
+        for crossing in cells.values():
+            for v1, i in crossing:
+                for v2, j in crossing:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (i, j)
+                        self.adjacency[v1].append((v2, i, j))
+        self._neighbors = {
+            var: frozenset(neighbor for neighbor, _, _ in adjacent)
+            for var, adjacent in self.adjacency.items()
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self._neighbors[var]
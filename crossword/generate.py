@@ -1,8 +1,25 @@
 import sys
+from collections import deque
 
 from crossword import *
 
 
+class Support():
+    """
+    How well the words for one variable are supported by those for a
+    neighbor: how many of the neighbor's words have each letter at their
+    overlap, and the neighbor's domain when those were counted.
+    """
+
+    def __init__(self, seen, counts, unsupported):
+        self.seen = seen
+        self.counts = counts
+
+        # Bitset of the words for the variable with a letter at the
+        # overlap that no word for the neighbor has
+        self.unsupported = unsupported
+
+
 class CrosswordCreator():
 
     def __init__(self, crossword):
@@ -11,10 +28,17 @@ class CrosswordCreator():
         """
         self.crossword = crossword
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.crossword.index.domain()
             for var in self.crossword.variables
         }
 
+        # Support for each arc (x, y) as of the last time it was revised
+        self.supports = dict()
+
+        # Earlier domains of variables pruned during search, most recent
+        # last, so a failed choice can be undone without copying domains
+        self.trail = []
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -99,15 +123,9 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        
+        index = self.crossword.index
         for variable in self.crossword.variables:
-            to_delete = set()
-            for word in self.domains[variable]:
-                if len(word) != variable.length:
-                    to_delete.add(word)
-                    
-            for word in to_delete:
-                self.domains[variable].remove(word)
+            self.domains[variable].keep(index.of_length(variable.length))
 
     def revise(self, x, y):
         """
@@ -121,18 +139,63 @@ class CrosswordCreator():
         overlap = self.crossword.overlaps[x, y]
         if not overlap:
             return False
-        found = False
-        revised = False
         i, j = overlap
-        for word_x in self.domains[x].copy():
-            found = False
-            for word_y in self.domains[y].copy():
-                if word_x[i] == word_y[j]:
-                    found = True
-            if found == False:
-                revised = True
-                self.domains[x].remove(word_x)
-        return revised
+        index = self.crossword.index
+        bits = self.domains[y].bits
+        support = self.supports.get((x, y))
+
+        if support is None or bits & ~support.seen:
+            # Count the words for `y` with each letter at the overlap
+            counts = {
+                letter: (bits & letter_bits).bit_count()
+                for letter, letter_bits in index.letters.get(
+                    (y.length, j), {}
+                ).items()
+            }
+            allowed = 0
+            for letter, count in counts.items():
+                if count:
+                    allowed |= index.with_letter(x.length, i, letter)
+            unsupported = index.of_length(x.length) & ~allowed
+            support = Support(bits, counts, unsupported)
+            self.supports[x, y] = support
+
+        elif bits != support.seen:
+            # Only take away the words `y` has lost since it was counted
+            removed = support.seen & ~bits
+            support.seen = bits
+            for letter, count in support.counts.items():
+                if not count:
+                    continue
+                lost = (removed & index.with_letter(y.length, j, letter))
+                lost = lost.bit_count()
+                if lost:
+                    support.counts[letter] = count - lost
+                    if count == lost:
+                        support.unsupported |= index.with_letter(
+                            x.length, i, letter
+                        )
+
+        return self.prune(x, ~support.unsupported)
+
+    def prune(self, var, bits):
+        """
+        Remove the words not in the bitset `bits` from the domain of
+        `var`, recording its previous domain on the trail.
+        Return True if any word was removed.
+        """
+        domain = self.domains[var]
+        previous = domain.bits
+        if not domain.keep(bits):
+            return False
+        self.trail.append((var, previous))
+        return True
+
+    def undo(self, mark):
+        """Restore the domains pruned since the trail was `mark` long."""
+        while len(self.trail) > mark:
+            var, bits = self.trail.pop()
+            self.domains[var].bits = bits
 
     def ac3(self, arcs=None):
         """
@@ -142,27 +205,27 @@ class CrosswordCreator():
 
         Return True if arc consistency is enforced and no domains are empty;
         return False if one or more domains end up empty.
-        """            
-        queue = arcs
-
-        if type(queue) == list and len(queue) == 0:
-            return True
-        
-        if not queue:
-            queue = []
-            for var_x in self.domains:
-                for var_y in self.domains:
-                    if var_x != var_y:
-                        queue.append((var_x, var_y))
-
+        """
+        if arcs is None:
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.crossword.neighbors(x)
+            ]
+
+        # Each arc is queued at most once at a time
+        queue = deque(arcs)
+        queued = set(queue)
         while queue:
-            (x, y) = queue.pop(0)
+            x, y = queue.popleft()
+            queued.discard((x, y))
             if self.revise(x, y):
                 if len(self.domains[x]) == 0:
                     return False
                 for neighbor in self.crossword.neighbors(x):
-                    if neighbor != y:
+                    if neighbor != y and (neighbor, x) not in queued:
                         queue.append((neighbor, x))
+                        queued.add((neighbor, x))
 
         return True
 
@@ -184,17 +247,16 @@ class CrosswordCreator():
         # An assignment is consistent if it satisfies all of the constraints of the problem: 
         # that is to say:
         # all values are distinct
-        values = []
+        values = set()
         for var, val in assignment.items():
             if val in values:
                 return False
-            values.append(val)
+            values.add(val)
             # every value is the correct length
             if len(val) != var.length:
                 return False
             # and there are no conflicts between neighboring variables.
-            for neighbor in self.crossword.neighbors(var):
-                (i, j) = self.crossword.overlaps[var, neighbor]
+            for neighbor, i, j in self.crossword.adjacency[var]:
                 if neighbor in assignment:
                     if val[i] != assignment[neighbor][j]:
                         return False
@@ -207,26 +269,30 @@ class CrosswordCreator():
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
         """
-        # optimize search by choosing values more likely to solve the puzzle
-        values = {}
-        variables = self.domains[var]
-        neighbors = self.crossword.neighbors(var)
-        for variable in variables:
-            if variable in assignment:
+        # Count the words for each unassigned neighbor with each letter
+        # where it overlaps `var`; a value for `var` rules out all the
+        # neighbor's words without its letter there
+        index = self.crossword.index
+        constraints = []
+        for neighbor, i, j in self.crossword.adjacency[var]:
+            if neighbor in assignment:
                 continue
-            else:
-                count = 0
-                for neighbor in neighbors:
-                    # count the number of neighbor domains containing the variable
-                    if variable in self.domains[neighbor]:
-                        count = count + 1
-                values[variable] = count   
-        # order the list of variables by least constraining value
-        # leaving the most opportunity for finding a solution with the other values
-        sorted_list_of_values = [item[0]
-                                 for item in sorted(values.items(), key=lambda item: item[1])]  
-
-        return sorted_list_of_values
+            bits = self.domains[neighbor].bits
+            counts = {
+                letter: (bits & letter_bits).bit_count()
+                for letter, letter_bits in index.letters.get(
+                    (neighbor.length, j), {}
+                ).items()
+            }
+            constraints.append((i, bits.bit_count(), counts))
+
+        def ruled_out(word):
+            return sum(
+                total - counts.get(word[i], 0)
+                for i, total, counts in constraints
+            )
+
+        return sorted(self.domains[var], key=ruled_out)
 
     def select_unassigned_variable(self, assignment):
         """
@@ -237,18 +303,20 @@ class CrosswordCreator():
         return values.
         """
         # Choose the variable with the minimum number of remaining values in its domain.
+        # Assigned variables are left out first, as their domains are
+        # down to one word
         sorted_list_of_domains = [(item[0], len(item[1])) for item in sorted(
-            self.domains.items(), key=lambda domain: len(domain[1]))]
+            ((variable, domain) for variable, domain in self.domains.items()
+             if variable not in assignment),
+            key=lambda domain: len(domain[1]))]
         # If there is a tie, choose the variable with the highest degree.
         max_neighbors_number = 0
         max_neighbors_variable = ''
         min_word_count = sorted_list_of_domains[0][1]
         for [variable, word_count] in sorted_list_of_domains:
-            if variable in assignment:
-                continue
             if max_neighbors_variable and word_count > min_word_count:
                 return max_neighbors_variable
-            neighbors_number = len(self.crossword.neighbors(variable))
+            neighbors_number = len(self.crossword.adjacency[variable])
             if not max_neighbors_variable or neighbors_number > max_neighbors_number:
                 max_neighbors_variable = variable
                 max_neighbors_number = neighbors_number
@@ -266,18 +334,66 @@ class CrosswordCreator():
         """
         if self.assignment_complete(assignment):
             return assignment
-        
+
         var = self.select_unassigned_variable(assignment)
         for word in self.order_domain_values(var, assignment):
+            if not self.consistent_with(var, word, assignment):
+                continue
+            mark = len(self.trail)
             assignment[var] = word
-            if self.consistent(assignment):
+            if self.infer(var, word, assignment):
                 result = self.backtrack(assignment)
                 if result:
                     return result
             del assignment[var]
+            self.undo(mark)
 
         return None
 
+    def consistent_with(self, var, word, assignment):
+        """
+        Return True if assigning `word` to `var` keeps a consistent
+        `assignment` consistent, checking only the overlaps of `var`.
+
+        Words are not checked against every other assigned word: `infer`
+        removes each assigned word from the domains of all unassigned
+        variables, so values from the domain of `var` are always distinct.
+        """
+        if len(word) != var.length:
+            return False
+        for neighbor, i, j in self.crossword.adjacency[var]:
+            if neighbor in assignment:
+                if word[i] != assignment[neighbor][j]:
+                    return False
+        return True
+
+    def infer(self, var, word, assignment):
+        """
+        Maintain arc consistency after assigning `word` to `var`: reduce
+        the domain of `var` to `word`, remove `word` from every other
+        unassigned variable's domain, and then make the arcs into every
+        changed domain consistent again. Domains pruned are recorded on
+        the trail.
+
+        Return False if some domain ends up empty.
+        """
+        index = self.crossword.index
+        bit = 1 << index.ids[word]
+        self.prune(var, bit)
+        changed = [var]
+        for other in self.crossword.variables:
+            if other == var or other in assignment:
+                continue
+            if other.length == var.length and self.prune(other, ~bit):
+                if len(self.domains[other]) == 0:
+                    return False
+                changed.append(other)
+        return self.ac3([
+            (neighbor, x)
+            for x in changed
+            for neighbor in self.crossword.neighbors(x)
+        ])
+
 
 def main():
 
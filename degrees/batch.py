@@ -0,0 +1,157 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import sys
+
+import cli
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer the pairs in a CSV file of source and target."
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="use the compact store"
+    )
+    parser.add_argument(
+        "--jsonl", action="store_true", help="write JSON lines, not CSV"
+    )
+    parser.add_argument("--workers", type=cli.positive_int, default=1)
+    parser.add_argument("directory")
+    parser.add_argument("pairs")
+    args = parser.parse_args()
+    directory, compact, workers = args.directory, args.compact, args.workers
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory, compact=compact)
+    print("Data loaded.", file=sys.stderr)
+
+    groups = read_pairs(args.pairs)
+    write = write_jsonl if args.jsonl else write_csv()
+
+    # Sources are answered in the order they first appear, so results
+    # for later rows may arrive early; hold them until every row before
+    # them has been written
+    waiting = {}
+    written = 0
+    for results in answer_all(groups, workers, directory, compact):
+        for result in results:
+            waiting[result["index"]] = result
+        while written in waiting:
+            write(waiting.pop(written))
+            written += 1
+        sys.stdout.flush()
+
+
+def answer_all(groups, workers, directory, compact):
+    """
+    Yield the results for each source in `groups`, in order,
+    answering them across `workers` processes.
+
+    Workers are forked so they share the graph already loaded by this
+    process. Where fork is not available, each worker loads the data
+    itself, which is cheap with the compact snapshot.
+    """
+    if workers == 1:
+        for source, queries in groups.items():
+            yield answer(source, queries)
+        return
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+        initializer, initargs = None, ()
+    else:
+        context = multiprocessing.get_context("spawn")
+        initializer, initargs = degrees.load_data, (directory, compact)
+    with context.Pool(workers, initializer, initargs) as pool:
+        yield from pool.imap(_answer, groups.items())
+
+
+def _answer(group):
+    return answer(*group)
+
+
+def read_pairs(filename):
+    """
+    Read a CSV file with `source` and `target` columns, each holding a
+    person_id or an unambiguous name.
+    Return a dictionary mapping each source to a list of
+    (index, target) queries, where `index` is the row number of the pair.
+    """
+    groups = {}
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for index, row in enumerate(reader):
+            source = resolve(row["source"])
+            target = resolve(row["target"])
+            groups.setdefault(source, []).append((index, target))
+    return groups
+
+
+def resolve(person):
+    """
+    Return `person` if it is a known person_id, otherwise the person_id
+    of the one person with that name, or `person` itself if there is none.
+    """
+    if person in degrees.people:
+        return person
+    return degrees.person_id_for_name(person, interactive=False) or person
+
+
+def answer(source, queries):
+    """
+    Answer every (index, target) query for `source` with one search.
+    Return a list of result dictionaries.
+    """
+    if source in degrees.people:
+        paths = degrees.paths_from(
+            source,
+            [target for _, target in queries if target in degrees.people]
+        )
+    else:
+        paths = {}
+
+    results = []
+    for index, target in queries:
+        path = paths.get(target)
+        results.append({
+            "index": index,
+            "source": source,
+            "target": target,
+            "degrees": None if path is None else len(path),
+            "path": path
+        })
+    return results
+
+
+def write_jsonl(result):
+    print(json.dumps(result))
+
+
+def write_csv():
+    """
+    Return a function writing results as CSV rows to standard output,
+    with paths written as space-separated movie_id/person_id steps.
+    """
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["index", "source", "target", "degrees", "path"])
+
+    def write(result):
+        path = result["path"]
+        writer.writerow([
+            result["index"],
+            result["source"],
+            result["target"],
+            "" if path is None else len(path),
+            "" if path is None else " ".join(
+                f"{movie_id}/{person_id}" for movie_id, person_id in path
+            )
+        ])
+
+    return write
+
+
+if __name__ == "__main__":
+    main()
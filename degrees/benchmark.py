@@ -0,0 +1,135 @@
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+import cli
+import degrees
+from util import QueueFrontier
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the degrees searches on random pairs."
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="use the compact store"
+    )
+    parser.add_argument(
+        "--memory", action="store_true", help="also measure peak memory"
+    )
+    parser.add_argument("directory")
+    parser.add_argument("pairs", nargs="?", type=cli.positive_int, default=20)
+    parser.add_argument("seed", nargs="?", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...")
+    load_start = time.perf_counter()
+    degrees.load_data(args.directory, compact=args.compact)
+    print(f"Data loaded in {time.perf_counter() - load_start:.2f}s.")
+
+    pairs = random_pairs(args.pairs, args.seed)
+    results = {}
+    for name, search in SEARCHES.items():
+        results[name] = run(search, pairs, memory=args.memory)
+
+    print(
+        f"{'search':<16}{'expanded':>12}{'frontier':>12}"
+        f"{'peak KiB':>12}{'seconds':>12}"
+    )
+    for name, result in results.items():
+        peak = "-" if result["peak"] is None else f"{result['peak'] // 1024}"
+        print(
+            f"{name:<16}{result['expanded']:>12}{result['frontier']:>12}"
+            f"{peak:>12}{result['seconds']:>12.3f}"
+        )
+
+    # Every search must agree on the length of the shortest path
+    lengths = [result["lengths"] for result in results.values()]
+    if any(other != lengths[0] for other in lengths[1:]):
+        sys.exit("Searches disagree on path lengths.")
+
+
+def bfs_path(source, target, stats):
+    """
+    Run `degrees.shortest_path`, counting the people it expands and the
+    largest its frontier gets.
+    """
+    neighbors_for_person = degrees.neighbors_for_person
+    frontier_class = degrees.QueueFrontier
+
+    def counting_neighbors(person_id):
+        stats["expanded"] = stats.get("expanded", 0) + 1
+        return neighbors_for_person(person_id)
+
+    class TrackingFrontier(QueueFrontier):
+        def add(self, node):
+            super().add(node)
+            stats["frontier"] = max(stats.get("frontier", 0), len(self.frontier))
+
+    degrees.neighbors_for_person = counting_neighbors
+    degrees.QueueFrontier = TrackingFrontier
+    try:
+        return degrees.shortest_path(source, target)
+    finally:
+        degrees.neighbors_for_person = neighbors_for_person
+        degrees.QueueFrontier = frontier_class
+
+
+# Search functions to compare, by name
+SEARCHES = {
+    "bfs": bfs_path,
+    "bidirectional": degrees.bidirectional_path,
+    "projected": degrees.projected_path,
+}
+
+
+def random_pairs(n, seed):
+    """
+    Return `n` random (source, target) pairs of people who starred
+    in at least one movie.
+    """
+    rng = random.Random(seed)
+    candidates = [
+        person_id for person_id in degrees.people
+        if degrees.people[person_id]["movies"]
+    ]
+    return [
+        (rng.choice(candidates), rng.choice(candidates))
+        for _ in range(n)
+    ]
+
+
+def run(search, pairs, memory=False):
+    """
+    Run `search` on every pair.
+    Return a dictionary of the people expanded, the largest frontier,
+    the wall time, the length of each path found and, if `memory` is
+    True, the peak memory allocated by a single search (measured in a
+    separate pass, as tracing slows searches down).
+    """
+    stats = {"expanded": 0, "frontier": 0}
+    lengths = []
+    start = time.perf_counter()
+    for source, target in pairs:
+        path = search(source, target, stats)
+        lengths.append(None if path is None else len(path))
+    stats["seconds"] = time.perf_counter() - start
+    stats["lengths"] = lengths
+
+    stats["peak"] = None
+    if memory:
+        tracemalloc.start()
+        peak = 0
+        for source, target in pairs:
+            tracemalloc.reset_peak()
+            search(source, target, {})
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        stats["peak"] = peak
+    return stats
+
+
+if __name__ == "__main__":
+    main()
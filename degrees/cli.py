@@ -0,0 +1,30 @@
+import argparse
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+def positive_int(value):
+    """Parse a whole number of at least 1, as an argparse type."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+
+def add_address_arguments(parser):
+    """Add the `--port=N` and `--socket=PATH` options to `parser`."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--port", type=positive_int, default=PORT,
+        help=f"TCP port on {HOST} (default {PORT})"
+    )
+    group.add_argument("--socket", metavar="PATH", help="Unix socket path")
+
+
+def address(args):
+    """
+    Return the server address given by the parsed `args`, either a
+    (host, port) pair or a Unix socket path.
+    """
+    return args.socket if args.socket is not None else (HOST, args.port)
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+
+import cli
+
+
+class Connection():
+    """A connection to a degrees server, sending one request at a time."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, address):
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            reader, writer = await asyncio.open_connection(*address)
+        return cls(reader, writer)
+
+    async def request(self, message):
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        await self.writer.drain()
+        line = await self.reader.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        return json.loads(line)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def query(address, message):
+    connection = await Connection.open(address)
+    try:
+        return await connection.request(message)
+    finally:
+        await connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Send one request to a degrees server."
+    )
+    cli.add_address_arguments(parser)
+    requests = parser.add_subparsers(dest="op", required=True)
+    path = requests.add_parser("path", help="shortest path between people")
+    path.add_argument("source")
+    path.add_argument("target")
+    requests.add_parser("lookup", help="people with a name").add_argument(
+        "name"
+    )
+    requests.add_parser("prefix", help="names with a prefix").add_argument(
+        "prefix"
+    )
+    requests.add_parser("fuzzy", help="names close to a name").add_argument(
+        "name"
+    )
+    requests.add_parser("update", help="read rows appended to the CSV files")
+    args = parser.parse_args()
+
+    message = {
+        name: value for name, value in vars(args).items()
+        if name not in ("port", "socket")
+    }
+    print(json.dumps(asyncio.run(query(cli.address(args), message)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
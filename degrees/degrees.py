@@ -1,6 +1,13 @@
-import csv
+import argparse
+import os
 import sys
+from bisect import insort
 
+from graph import Graph
+from ingest import read_csv
+from landmarks import load_landmarks
+from nameindex import GraphNameKeys, NameIndex
+from snapshot import FILES, load_graph
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,6 +19,19 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed store, if loaded with `compact=True`
+graph = None
+
+# Prefix and fuzzy lookups over `names`
+name_index = None
+
+# Maps each CSV file path to the byte offset it has been read up to
+offsets = {}
+
+# Star rows naming a person or movie not loaded yet, retried whenever
+# more rows are read
+pending_stars = []
+
 
 class Node():
     def __init__(self, state, parent):
@@ -19,53 +39,169 @@ class Node():
         self.parent = parent
 
 
-def load_data(directory):
+def load_data(directory, compact=False, cache=True, progress=False):
     """
     Load data from CSV files into memory.
+
+    If `compact` is True, load the data into a `Graph` instead, and make
+    `names`, `people` and `movies` read-only views over it. With `cache`,
+    the graph is memory-mapped from a snapshot next to the CSV files,
+    which is rebuilt whenever any of them changes.
+
+    If `progress` is True, report progress reading each CSV file.
+    """
+    global graph, names, people, movies, name_index
+    if compact:
+        if cache:
+            graph = load_graph(directory, progress)
+        else:
+            graph = Graph.from_csv(directory, progress)
+        names, people, movies = graph.names, graph.people, graph.movies
+        name_index = NameIndex(GraphNameKeys(graph), names)
+        return
+    if graph is not None:
+        graph = None
+        names, people, movies = {}, {}, {}
+
+    offsets.clear()
+    pending_stars.clear()
+    _read_rows(directory, progress)
+    name_index = NameIndex(sorted(names), names)
+
+
+def update_data(directory, progress=False):
     """
+    Read only the rows appended to the CSV files since they were loaded.
+
+    Returns the set of person_ids who may have new connections (everyone
+    starring in a movie that gained stars). Returns None if the data had
+    to be reloaded from scratch, because it is in the compact store or a
+    file shrank, in which case anything may have changed.
+
+    Only the dictionaries are updated in place. The compact store is
+    rebuilt in full, and landmarks built for the old files are rebuilt
+    the next time they are loaded.
+    """
+    paths = [f"{directory}/{filename}" for filename in FILES]
+    if graph is not None:
+        load_data(directory, compact=True, progress=progress)
+        return None
+    if any(
+        path not in offsets or os.path.getsize(path) < offsets[path]
+        for path in paths
+    ):
+        names.clear()
+        people.clear()
+        movies.clear()
+        load_data(directory, progress=progress)
+        return None
+
+    # Leave a file whose last row is still being written for next time
+    start = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                start[path] = offsets[path]
+
+    new_names, new_stars = _read_rows(directory, progress, start)
+    for key in new_names:
+        insort(name_index.keys, key)
+
+    affected = set()
+    for movie_id in new_stars:
+        affected.update(movies[movie_id]["stars"])
+    return affected
+
+
+def _read_rows(directory, progress=False, start=None):
+    """
+    Add the rows of the CSV files in `directory` to `names`, `people` and
+    `movies`, recording how far each file was read in `offsets`.
+
+    If `start` is given, only read the files it maps to a byte offset,
+    from that offset on.
+    Returns the set of names added and the set of movie_ids given stars.
+    """
+    new_names = set()
+    new_stars = set()
+
+    def rows(filename, columns):
+        path = f"{directory}/{filename}"
+        if start is None:
+            return read_csv(path, columns, progress, positions=offsets)
+        if path not in start:
+            return []
+        return read_csv(path, columns, progress, start[path], offsets)
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in rows("people.csv", ("id", "name", "birth")):
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        key = name.lower()
+        person_ids = names.get(key)
+        if person_ids is None:
+            names[key] = {person_id}
+            new_names.add(key)
+        else:
+            person_ids.add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    for movie_id, title, year in rows("movies.csv", ("id", "title", "year")):
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
+
+    # Load stars, along with earlier rows whose person or movie may have
+    # been added since
+    stars = pending_stars[:]
+    pending_stars.clear()
+    stars.extend(rows("stars.csv", ("person_id", "movie_id")))
+    for person_id, movie_id in stars:
+        # Hold back rows for unknown people or movies, without adding
+        # either half of the connection, as they may still be written
+        if person_id not in people or movie_id not in movies:
+            pending_stars.append((person_id, movie_id))
+            continue
+        people[person_id]["movies"].add(movie_id)
+        movies[movie_id]["stars"].add(person_id)
+        new_stars.add(movie_id)
+
+    return new_names, new_stars
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people."
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="use the compact store"
+    )
+    search = parser.add_mutually_exclusive_group()
+    search.add_argument("--bidirectional", action="store_true")
+    search.add_argument("--landmarks", action="store_true")
+    search.add_argument("--projected", action="store_true")
+    parser.add_argument(
+        "--progress", action="store_true", help="report loading progress"
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    args = parser.parse_args()
+    directory = args.directory
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(
+        directory,
+        compact=args.compact or args.landmarks,
+        progress=args.progress
+    )
+    if args.landmarks:
+        landmarks = load_landmarks(directory, graph)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -74,7 +210,14 @@ def main():
     target = person_id_for_name(input("Name: "))
     if target is None:
         sys.exit("Person not found.")
-    path = shortest_path(source, target)
+    if args.landmarks:
+        path = landmarks.shortest_path(source, target)
+    elif args.bidirectional:
+        path = bidirectional_path(source, target)
+    elif args.projected:
+        path = projected_path(source, target)
+    else:
+        path = shortest_path(source, target)
     print(path)
     if path is None:
         print("Not connected.")
@@ -143,15 +286,211 @@ def shortest_path(source, target):
         explored.add(next_person_id)
 
 
-def person_id_for_name(name):
+def bidirectional_path(source, target, stats=None):
+    """
+    Same as `shortest_path`, but searches from both the source and the
+    target, always expanding whichever side has the smaller frontier,
+    and joins the two halves where they meet.
+
+    If `stats` is a dictionary, records the number of people expanded
+    and the largest frontier in it.
+    """
+    if source == target:
+        return []
+
+    # Each side maps a reached person to the (movie_id, person_id) step
+    # linking it back towards where that side started
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    expanded = 0
+    largest = 1
+    path = None
+
+    while forward_frontier and backward_frontier and path is None:
+        if len(forward_frontier) <= len(backward_frontier):
+            frontier, reached, other = forward_frontier, forward, backward
+        else:
+            frontier, reached, other = backward_frontier, backward, forward
+
+        # Expand one whole level, keeping the meeting point that gives
+        # the shortest path through the other side
+        next_frontier = []
+        meeting = None
+        for person_id in frontier:
+            expanded += 1
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id in reached:
+                    continue
+                reached[neighbor_id] = (movie_id, person_id)
+                next_frontier.append(neighbor_id)
+                if neighbor_id in other:
+                    length = _steps(other, neighbor_id)
+                    if meeting is None or length < meeting[0]:
+                        meeting = (length, neighbor_id)
+        if meeting is not None:
+            path = _join(forward, backward, meeting[1])
+
+        largest = max(largest, len(next_frontier))
+        if reached is forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
+        stats["frontier"] = max(stats.get("frontier", 0), largest)
+    return path
+
+
+def paths_from(source, targets):
+    """
+    Run a single breadth-first search from `source` and return a
+    dictionary mapping each person_id in `targets` to its shortest list
+    of (movie_id, person_id) pairs, or None if it is not connected.
+    """
+    # Maps each reached person to the (movie_id, person_id) step
+    # linking it back towards the source
+    reached = {source: None}
+    remaining = set(targets) - {source}
+    frontier = [source]
+    while frontier and remaining:
+        next_frontier = []
+        for person_id in frontier:
+            for movie_id, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in reached:
+                    reached[neighbor_id] = (movie_id, person_id)
+                    next_frontier.append(neighbor_id)
+                    remaining.discard(neighbor_id)
+        frontier = next_frontier
+
+    paths = {}
+    for target in targets:
+        paths[target] = _path(reached, target) if target in reached else None
+    return paths
+
+
+def distances_from_all(sources, limit):
+    """
+    Return a dictionary mapping each person within `limit` steps of any
+    person_id in `sources` to the number of steps to the nearest one.
+    """
+    distances = {person_id: 0 for person_id in sources}
+    frontier = list(distances)
+    steps = 0
+    while frontier and steps < limit:
+        steps += 1
+        next_frontier = []
+        for person_id in frontier:
+            for _, neighbor_id in neighbors_for_person(person_id):
+                if neighbor_id not in distances:
+                    distances[neighbor_id] = steps
+                    next_frontier.append(neighbor_id)
+        frontier = next_frontier
+    return distances
+
+
+def projected_path(source, target, stats=None):
+    """
+    Same as `shortest_path`, but searches people -> movies -> people,
+    expanding each movie's cast only the first time the movie is reached
+    rather than queueing one state per (movie_id, person_id) pair.
+
+    If `stats` is a dictionary, records the number of people expanded
+    and the largest frontier in it.
+    """
+    if source == target:
+        return []
+
+    reached = {source: None}
+    seen_movies = set()
+    frontier = [source]
+    expanded = 0
+    largest = 0
+    path = None
+    while frontier and path is None:
+        largest = max(largest, len(frontier))
+        next_frontier = []
+        for person_id in frontier:
+            expanded += 1
+            for movie_id in people[person_id]["movies"]:
+                if movie_id in seen_movies:
+                    continue
+                seen_movies.add(movie_id)
+                for star_id in movies[movie_id]["stars"]:
+                    if star_id not in reached:
+                        reached[star_id] = (movie_id, person_id)
+                        next_frontier.append(star_id)
+            if target in reached:
+                path = _path(reached, target)
+                break
+        frontier = next_frontier
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
+        stats["frontier"] = max(stats.get("frontier", 0), largest)
+    return path
+
+
+def _path(reached, person_id):
+    """
+    Return the (movie_id, person_id) path from the start of `reached`
+    to `person_id`, where `reached` maps each person to the step
+    linking it back towards the start.
+    """
+    path = []
+    while reached[person_id] is not None:
+        movie_id, previous_id = reached[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous_id
+    path.reverse()
+    return path
+
+
+def _steps(reached, person_id):
+    """Return how many steps `person_id` is from its side's start."""
+    steps = 0
+    while reached[person_id] is not None:
+        person_id = reached[person_id][1]
+        steps += 1
+    return steps
+
+
+def _join(forward, backward, meeting_id):
+    """
+    Build the (movie_id, person_id) path from the source through
+    `meeting_id` to the target.
+    """
+    path = _path(forward, meeting_id)
+    person_id = meeting_id
+    while backward[person_id] is not None:
+        movie_id, next_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+    return path
+
+
+def person_id_for_name(name, birth=None, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If `birth` is given, only people born that year match. If several
+    people still match and `interactive` is False, returns None
+    instead of asking which one was meant.
     """
     person_ids = list(names.get(name.lower(), set()))
+    if birth is not None:
+        person_ids = [
+            person_id for person_id in person_ids
+            if people[person_id]["birth"] == str(birth)
+        ]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -174,6 +513,8 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,306 @@
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from ingest import read_csv
+
+
+class StringTable():
+    """
+    Immutable sequence of strings stored as one UTF-8 blob plus an
+    array of offsets, instead of one Python object per string.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        blob = bytearray()
+        offsets = array("q", [0])
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        return cls(bytes(blob), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class Graph():
+    """
+    Compact store for the people/movies star graph.
+
+    Person and movie IMDb ids are interned to dense integers (their rank
+    in sorted id order), and the bipartite star graph is kept in CSR form:
+    the movies of person `p` are `person_movies[person_offsets[p]:
+    person_offsets[p + 1]]`, and likewise for the stars of a movie.
+    """
+
+    def __init__(self, person_keys, person_names, person_births,
+                 person_offsets, person_movies,
+                 movie_keys, movie_titles, movie_years,
+                 movie_offsets, movie_stars, name_order):
+        self.person_keys = person_keys
+        self.person_names = person_names
+        self.person_births = person_births
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_keys = movie_keys
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.name_order = name_order
+
+        # Read-only views shaped like the `names`, `people` and `movies`
+        # dictionaries in degrees.py
+        self.names = NamesView(self)
+        self.people = PeopleView(self)
+        self.movies = MoviesView(self)
+
+    @classmethod
+    def from_csv(cls, directory, progress=False):
+        """
+        Load the people, movies and stars CSV files of `directory`.
+        """
+        # Load people
+        rows = sorted(
+            (int(person_id), name, birth)
+            for person_id, name, birth in read_csv(
+                f"{directory}/people.csv", ("id", "name", "birth"), progress
+            )
+        )
+        person_keys = array("q", (row[0] for row in rows))
+        person_names = StringTable.from_strings(row[1] for row in rows)
+        person_births = array("h", (_year(row[2]) for row in rows))
+        del rows
+
+        # Load movies
+        rows = sorted(
+            (int(movie_id), title, year)
+            for movie_id, title, year in read_csv(
+                f"{directory}/movies.csv", ("id", "title", "year"), progress
+            )
+        )
+        movie_keys = array("q", (row[0] for row in rows))
+        movie_titles = StringTable.from_strings(row[1] for row in rows)
+        movie_years = array("h", (_year(row[2]) for row in rows))
+        del rows
+
+        # Load stars as two parallel edge arrays, skipping unknown ids
+        person_index = {key: i for i, key in enumerate(person_keys)}
+        movie_index = {key: i for i, key in enumerate(movie_keys)}
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person_id, movie_id in read_csv(
+            f"{directory}/stars.csv", ("person_id", "movie_id"), progress
+        ):
+            p = person_index.get(int(person_id))
+            m = movie_index.get(int(movie_id))
+            if p is None or m is None:
+                continue
+            edge_people.append(p)
+            edge_movies.append(m)
+        del person_index, movie_index
+
+        person_offsets, person_movies = _csr(
+            len(person_keys), edge_people, edge_movies
+        )
+        movie_offsets, movie_stars = _csr(
+            len(movie_keys), edge_movies, edge_people
+        )
+
+        # Order people by lowercase name for name lookups
+        name_order = array("i", sorted(
+            range(len(person_keys)),
+            key=lambda p: person_names[p].lower()
+        ))
+
+        return cls(person_keys, person_names, person_births,
+                   person_offsets, person_movies,
+                   movie_keys, movie_titles, movie_years,
+                   movie_offsets, movie_stars, name_order)
+
+    def person_index(self, person_id):
+        """Return the dense index of `person_id`, or None if unknown."""
+        return _find(self.person_keys, person_id)
+
+    def movie_index(self, movie_id):
+        """Return the dense index of `movie_id`, or None if unknown."""
+        return _find(self.movie_keys, movie_id)
+
+    def person_id(self, p):
+        return str(self.person_keys[p])
+
+    def movie_id(self, m):
+        return str(self.movie_keys[m])
+
+    def movies_of(self, p):
+        """Return the movie indices person `p` starred in."""
+        return self.person_movies[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_of(self, m):
+        """Return the person indices starring in movie `m`."""
+        return self.movie_stars[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbor_indices(self, p):
+        """
+        Yield (movie, person) index pairs for people
+        who starred with person `p`.
+        """
+        for m in self.movies_of(p):
+            for q in self.stars_of(m):
+                yield m, q
+
+    def neighbors(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        p = self.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return set(
+            (self.movie_id(m), self.person_id(q))
+            for m, q in self.neighbor_indices(p)
+        )
+
+    def name_range(self, lower, upper=None):
+        """
+        Return the (start, end) slice of `name_order` whose lowercase names
+        are >= `lower` and < `upper` (or == `lower` if `upper` is None).
+        """
+        key = self._lower_name
+        start = bisect_left(self.name_order, lower, key=key)
+        if upper is None:
+            end = start
+            while (end < len(self.name_order)
+                   and key(self.name_order[end]) == lower):
+                end += 1
+        else:
+            end = bisect_left(self.name_order, upper, lo=start, key=key)
+        return start, end
+
+    def _lower_name(self, p):
+        return self.person_names[p].lower()
+
+
+class PeopleView(Mapping):
+    """Maps person_ids to a dictionary of: name, birth, movies."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        p = graph.person_index(person_id)
+        if p is None:
+            raise KeyError(person_id)
+        return {
+            "name": graph.person_names[p],
+            "birth": _year_str(graph.person_births[p]),
+            "movies": set(graph.movie_id(m) for m in graph.movies_of(p))
+        }
+
+    def __iter__(self):
+        return (str(key) for key in self.graph.person_keys)
+
+    def __len__(self):
+        return len(self.graph.person_keys)
+
+
+class MoviesView(Mapping):
+    """Maps movie_ids to a dictionary of: title, year, stars."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        m = graph.movie_index(movie_id)
+        if m is None:
+            raise KeyError(movie_id)
+        return {
+            "title": graph.movie_titles[m],
+            "year": _year_str(graph.movie_years[m]),
+            "stars": set(graph.person_id(p) for p in graph.stars_of(m))
+        }
+
+    def __iter__(self):
+        return (str(key) for key in self.graph.movie_keys)
+
+    def __len__(self):
+        return len(self.graph.movie_keys)
+
+
+class NamesView(Mapping):
+    """Maps lowercase names to a set of corresponding person_ids."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.count = None
+
+    def __getitem__(self, name):
+        graph = self.graph
+        start, end = graph.name_range(name)
+        if start == end:
+            raise KeyError(name)
+        return set(graph.person_id(p) for p in graph.name_order[start:end])
+
+    def __iter__(self):
+        previous = None
+        for p in self.graph.name_order:
+            name = self.graph.person_names[p].lower()
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        if self.count is None:
+            self.count = sum(1 for _ in self)
+        return self.count
+
+
+def _find(keys, key):
+    """Return the index of numeric string `key` in sorted `keys`, or None."""
+    try:
+        key = int(key)
+    except (TypeError, ValueError):
+        return None
+    i = bisect_left(keys, key)
+    if i < len(keys) and keys[i] == key:
+        return i
+    return None
+
+
+def _csr(n, sources, targets):
+    """
+    Group `targets` by `sources` with a counting sort.
+    Return (offsets, values) where the values for source `s` are
+    `values[offsets[s]:offsets[s + 1]]`.
+    """
+    offsets = array("q", bytes(8 * (n + 1)))
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+    cursor = array("q", offsets[:n])
+    values = array("i", bytes(4 * len(targets)))
+    for s, t in zip(sources, targets):
+        values[cursor[s]] = t
+        cursor[s] += 1
+    return offsets, values
+
+
+def _year(value):
+    """Parse a year column, using 0 for missing values."""
+    return int(value) if value else 0
+
+
+def _year_str(value):
+    return str(value) if value else ""
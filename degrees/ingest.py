@@ -0,0 +1,86 @@
+import csv
+import os
+import sys
+import time
+from operator import itemgetter
+
+# Seconds between progress updates
+INTERVAL = 1
+
+
+def read_csv(path, columns, progress=False, start=None, positions=None):
+    """
+    Yield a tuple of the named `columns` (at least two) for each row of
+    the CSV file `path`, looking each column up by position rather than
+    building a dictionary per row.
+
+    If `progress` is True, report rows read and throughput on standard
+    error as the file is read. If `start` is given, skip to that byte
+    offset after the header. If `positions` is a dictionary, record the
+    offset the file was read up to in `positions[path]`.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        getter = itemgetter(*(header.index(column) for column in columns))
+        if start is not None:
+            f.seek(start)
+        reader = csv.reader(f)
+
+        # Blank lines come through as empty rows, and are skipped as
+        # csv.DictReader would
+        if not progress:
+            for row in reader:
+                if row:
+                    yield getter(row)
+            if positions is not None:
+                positions[path] = f.tell()
+            return
+
+        report = Progress(os.path.basename(path), os.path.getsize(path))
+        next_report = time.perf_counter() + INTERVAL
+        rows = 0
+        for row in reader:
+            if not row:
+                continue
+            yield getter(row)
+            rows += 1
+            if rows % 4096 == 0 and time.perf_counter() >= next_report:
+                report.update(rows, f.buffer.tell())
+                next_report += INTERVAL
+        report.finish(rows)
+        if positions is not None:
+            positions[path] = f.tell()
+
+
+class Progress():
+    """Reports how far through a file ingestion is, and how fast."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self.start = time.perf_counter()
+        self.width = 0
+
+    def update(self, rows, position):
+        elapsed = time.perf_counter() - self.start
+        percent = 100 * position / self.size if self.size else 100
+        self.show(
+            f"{self.name}: {rows:,} rows ({percent:.0f}%), "
+            f"{rows / elapsed:,.0f} rows/s",
+            end=""
+        )
+
+    def finish(self, rows):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        megabytes = self.size / 2 ** 20
+        self.show(
+            f"{self.name}: {rows:,} rows in {elapsed:.2f}s "
+            f"({rows / elapsed:,.0f} rows/s, {megabytes / elapsed:.1f} MB/s)"
+        )
+
+    def show(self, message, end="\n"):
+        """Overwrite the current progress line with `message`."""
+        print(
+            f"\r{message.ljust(self.width)}", end=end, file=sys.stderr, flush=True
+        )
+        self.width = len(message)
@@ -0,0 +1,217 @@
+import heapq
+import json
+import mmap
+import os
+from array import array
+
+from snapshot import fingerprint
+
+MAGIC = b"DEGLAND1"
+
+# Number of landmarks to pick by default
+LANDMARKS = 16
+
+# Distance stored for people a landmark cannot reach
+UNREACHABLE = 255
+
+
+class Landmarks():
+    """
+    Distance oracle over a compact `Graph`.
+
+    Stores the breadth-first distance from each of a few landmark people
+    to every person. By the triangle inequality, for any landmark `l`,
+    |d(l, s) - d(l, t)| <= d(s, t) <= d(l, s) + d(l, t).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        # distances[i] holds the distance from landmarks[i] to each person
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, k=LANDMARKS):
+        """
+        Pick the `k` people who starred in the most movies as
+        landmarks, and search from each of them.
+        """
+        offsets = graph.person_offsets
+        landmarks = heapq.nlargest(
+            k, range(len(offsets) - 1),
+            key=lambda p: offsets[p + 1] - offsets[p]
+        )
+        distances = [distances_from(graph, p) for p in landmarks]
+        return cls(graph, landmarks, distances)
+
+    def bounds(self, s, t):
+        """
+        Return (lower, upper) bounds on the degrees of separation between
+        person indices `s` and `t`. Return (None, None) if the landmarks
+        show they are not connected; `upper` is None if no landmark
+        reaches both.
+        """
+        lower = 0
+        upper = None
+        for distances in self.distances:
+            ds = distances[s]
+            dt = distances[t]
+            if ds == UNREACHABLE and dt == UNREACHABLE:
+                continue
+            if ds == UNREACHABLE or dt == UNREACHABLE:
+                return None, None
+            lower = max(lower, abs(ds - dt))
+            if upper is None or ds + dt < upper:
+                upper = ds + dt
+        return lower, upper
+
+    def estimate(self, source, target):
+        """
+        Return the approximate degrees of separation between person_ids
+        `source` and `target`, or None if they are not known to be
+        connected.
+        """
+        s = self.graph.person_index(source)
+        t = self.graph.person_index(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return 0
+        _, upper = self.bounds(s, t)
+        return upper
+
+    def shortest_path(self, source, target):
+        """
+        Same as `degrees.shortest_path`, but an A* search using the
+        landmark lower bound as its heuristic.
+        """
+        graph = self.graph
+        s = graph.person_index(source)
+        t = graph.person_index(target)
+        if s is None or t is None:
+            return None
+        if s == t:
+            return []
+        lower, _ = self.bounds(s, t)
+        if lower is None:
+            return None
+
+        # Maps each reached person to (steps from source, movie, previous)
+        reached = {s: (0, None, None)}
+        heap = [(lower, 0, s)]
+        while heap:
+            _, steps, p = heapq.heappop(heap)
+            if p == t:
+                return self._path(reached, t)
+            if steps > reached[p][0]:
+                continue
+            for m, q in graph.neighbor_indices(p):
+                if q in reached and reached[q][0] <= steps + 1:
+                    continue
+                lower, _ = self.bounds(q, t)
+                if lower is None:
+                    continue
+                reached[q] = (steps + 1, m, p)
+                heapq.heappush(heap, (steps + 1 + lower, steps + 1, q))
+        return None
+
+    def _path(self, reached, t):
+        path = []
+        while reached[t][2] is not None:
+            _, m, p = reached[t]
+            path.append((self.graph.movie_id(m), self.graph.person_id(t)))
+            t = p
+        path.reverse()
+        return path
+
+
+def distances_from(graph, source):
+    """
+    Return a byte array of the breadth-first distance from person
+    index `source` to every person.
+    """
+    distances = array("B", [UNREACHABLE]) * (len(graph.person_offsets) - 1)
+    seen_movies = bytearray(len(graph.movie_offsets) - 1)
+    distances[source] = 0
+    frontier = [source]
+    steps = 0
+    while frontier and steps < UNREACHABLE - 1:
+        steps += 1
+        next_frontier = []
+        for p in frontier:
+            for m in graph.movies_of(p):
+                if seen_movies[m]:
+                    continue
+                seen_movies[m] = 1
+                for q in graph.stars_of(m):
+                    if distances[q] == UNREACHABLE:
+                        distances[q] = steps
+                        next_frontier.append(q)
+        frontier = next_frontier
+    return distances
+
+
+def landmarks_path(directory):
+    return os.path.join(directory, "degrees.landmarks")
+
+
+def load_landmarks(directory, graph, k=LANDMARKS):
+    """
+    Return the Landmarks for `graph`, loaded from `directory` if they
+    were built for the current CSV files, or built (and saved for next
+    time) otherwise.
+    """
+    path = landmarks_path(directory)
+    current = fingerprint(directory)
+    landmarks = load(path, current, graph)
+    if landmarks is None or len(landmarks.landmarks) != k:
+        landmarks = Landmarks.build(graph, k)
+        try:
+            save(landmarks, path, current)
+        except OSError:
+            pass
+    return landmarks
+
+
+def save(landmarks, path, stamp):
+    """
+    Write the landmark distance tables to `path`, tagged with `stamp`.
+    """
+    header = json.dumps({
+        "fingerprint": stamp,
+        "landmarks": [int(p) for p in landmarks.landmarks]
+    }).encode("utf-8")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for distances in landmarks.distances:
+            f.write(distances)
+    os.replace(tmp, path)
+
+
+def load(path, stamp, graph):
+    """
+    Memory-map the landmark tables in `path`.
+    Return None if there are none or they do not match `stamp`.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if header["fingerprint"] != stamp:
+                return None
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        return None
+
+    n = len(graph.person_offsets) - 1
+    start = len(MAGIC) + 8 + length
+    distances = [
+        data[start + i * n:start + (i + 1) * n]
+        for i in range(len(header["landmarks"]))
+    ]
+    return Landmarks(graph, header["landmarks"], distances)
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import cli
+from client import Connection
+from ingest import read_csv
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure a degrees server's latency under load."
+    )
+    cli.add_address_arguments(parser)
+    parser.add_argument("--connections", type=cli.positive_int, default=8)
+    parser.add_argument("--requests", type=cli.positive_int, default=1000)
+    parser.add_argument("--people", type=cli.positive_int, default=1000)
+    parser.add_argument("directory")
+    args = parser.parse_args()
+
+    # Draw pairs from a fixed pool of people so some requests repeat
+    rng = random.Random(0)
+    person_ids = [
+        person_id for person_id, _ in
+        read_csv(f"{args.directory}/people.csv", ("id", "name"))
+    ]
+    pool = rng.sample(person_ids, min(args.people, len(person_ids)))
+    pairs = [
+        (rng.choice(pool), rng.choice(pool))
+        for _ in range(args.requests)
+    ]
+
+    latencies, seconds = asyncio.run(
+        run(cli.address(args), pairs, args.connections)
+    )
+    report(latencies, seconds)
+
+
+async def run(address, pairs, connections):
+    """
+    Send a path request for every pair over `connections` concurrent
+    connections. Return the latency of each request and the total time.
+    """
+    queue = asyncio.Queue()
+    for pair in pairs:
+        queue.put_nowait(pair)
+    latencies = []
+
+    async def worker():
+        connection = await Connection.open(address)
+        try:
+            while not queue.empty():
+                source, target = queue.get_nowait()
+                start = time.perf_counter()
+                reply = await connection.request(
+                    {"op": "path", "source": source, "target": target}
+                )
+                latencies.append(time.perf_counter() - start)
+                if not reply["ok"]:
+                    print(f"Error: {reply['error']}", file=sys.stderr)
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    return latencies, time.perf_counter() - start
+
+
+def report(latencies, seconds):
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    print(f"Requests:   {len(latencies)}")
+    print(f"Throughput: {len(latencies) / seconds:.1f} requests/s")
+    for p in (50, 90, 99):
+        print(f"p{p}:        {percentile(p) * 1000:.2f} ms")
+    print(f"Max:        {latencies[-1] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import difflib
+from bisect import bisect_left
+from collections.abc import Sequence
+
+# Number of sorted names after each fuzzy search anchor that get scored
+WINDOW = 500
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy lookups over a sorted sequence of lowercase names.
+
+    `keys` may repeat a name once per person sharing it; `names` maps
+    each lowercase name to its set of person_ids.
+    """
+
+    def __init__(self, keys, names):
+        self.keys = keys
+        self.names = names
+
+    def prefix(self, prefix, limit=10):
+        """
+        Return up to `limit` distinct names starting with `prefix`,
+        in sorted order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(matches) < limit:
+            name = self.keys[i]
+            if not name.startswith(prefix):
+                break
+            if not matches or matches[-1] != name:
+                matches.append(name)
+            i += 1
+        return matches
+
+    def fuzzy(self, query, k=5, cutoff=0.6):
+        """
+        Return up to `k` names most similar to `query`, best first.
+
+        Rather than scoring every name, finds where `query` stops matching
+        the names sorting next to it, and scores only the names sorting
+        near `query`, near its matching part, and near `query` with the
+        first mismatching character deleted or swapped with the next one.
+        A typo in the first letter may not be found.
+        """
+        query = query.lower()
+        i = bisect_left(self.keys, query)
+        common = 0
+        for j in (i - 1, i):
+            if 0 <= j < len(self.keys):
+                common = max(common, _common_prefix(query, self.keys[j]))
+
+        anchors = [
+            query,
+            query[:common],
+            query[:common] + query[common + 1:],
+            query[:common] + query[common + 1:common + 2] + query[common:common + 1]
+            + query[common + 2:]
+        ]
+        candidates = set()
+        for anchor in anchors:
+            start = bisect_left(self.keys, anchor)
+            for j in range(max(0, start - WINDOW // 2),
+                           min(len(self.keys), start + WINDOW)):
+                candidates.add(self.keys[j])
+        return difflib.get_close_matches(query, candidates, n=k, cutoff=cutoff)
+
+    def lookup(self, name):
+        """Return the set of person_ids named `name` (case-insensitive)."""
+        return set(self.names.get(name.lower(), set()))
+
+
+def _common_prefix(a, b):
+    """Return the length of the longest common prefix of `a` and `b`."""
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class GraphNameKeys(Sequence):
+    """Sorted lowercase names of a compact `Graph`, one per person."""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, i):
+        return self.graph.person_names[self.graph.name_order[i]].lower()
+
+    def __len__(self):
+        return len(self.graph.name_order)
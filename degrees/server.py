@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import sys
+from collections import OrderedDict
+
+import cli
+import degrees
+
+# Number of recent path results kept
+CACHE_SIZE = 4096
+
+
+class ResultCache():
+    """Least-recently-used cache of path results keyed by (source, target)."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.results = OrderedDict()
+
+    def get(self, key):
+        if key not in self.results:
+            return None
+        self.results.move_to_end(key)
+        return self.results[key]
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+
+    def invalidate(self, affected):
+        """
+        Drop the results a graph update may have changed, where
+        `affected` holds everyone who may have new connections, or is
+        None if anything may have changed.
+
+        Connections are only ever added, so a cached path stays a valid
+        path; it is only dropped if a shorter one could now exist. Any
+        new path from s to t runs through two affected people, so it is
+        at least d(s, affected) + 1 + d(affected, t) steps long.
+        """
+        if affected is None:
+            self.results.clear()
+            return
+        if not affected:
+            return
+
+        longest = max(
+            (result["degrees"] for result in self.results.values()
+             if result["degrees"] is not None),
+            default=0
+        )
+        distances = degrees.distances_from_all(affected, longest)
+        for (source, target), result in list(self.results.items()):
+            if result["degrees"] is not None:
+                shortest_new = (
+                    distances.get(source, longest) +
+                    distances.get(target, longest) + 1
+                )
+                if shortest_new >= result["degrees"]:
+                    continue
+            del self.results[source, target]
+
+
+class DegreesServer():
+    """
+    Answers JSON requests, one per line, against the graph already
+    loaded into `degrees`:
+
+        {"op": "path", "source": ..., "target": ...}
+        {"op": "lookup", "name": ..., "birth": ...}
+        {"op": "prefix", "prefix": ..., "limit": ...}
+        {"op": "fuzzy", "name": ..., "limit": ...}
+        {"op": "update"}
+
+    People may be given by person_id or unambiguous name. Every reply is
+    one JSON line with "ok" and either the result or an "error".
+    "update" reads rows appended to the CSV files in `directory` since
+    they were loaded, waiting for running searches to finish first. The
+    compact store is not updated in place but reloaded in full, in a
+    worker thread.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache = ResultCache()
+
+        # Searches in progress, and whether an update is waiting for them
+        self.condition = asyncio.Condition()
+        self.searching = 0
+        self.updating = False
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    reply = await self.answer(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": f"bad request: {e}"}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def answer(self, request):
+        op = request["op"]
+        if op == "path":
+            return await self.path(
+                field(request, "source"), field(request, "target")
+            )
+        elif op == "lookup":
+            name = field(request, "name")
+            person_ids = sorted(degrees.names.get(name.lower(), ()))
+            if request.get("birth") is not None:
+                person_ids = [
+                    person_id for person_id in person_ids
+                    if degrees.people[person_id]["birth"] == str(request["birth"])
+                ]
+            return {"ok": True, "people": [
+                dict(id=person_id, name=degrees.people[person_id]["name"],
+                     birth=degrees.people[person_id]["birth"])
+                for person_id in person_ids
+            ]}
+        elif op == "prefix":
+            limit = request.get("limit", 10)
+            return {"ok": True, "names": degrees.name_index.prefix(
+                field(request, "prefix"), limit
+            )}
+        elif op == "fuzzy":
+            limit = request.get("limit", 5)
+            return {"ok": True, "names": degrees.name_index.fuzzy(
+                field(request, "name"), limit
+            )}
+        elif op == "update":
+            return await self.update()
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+    async def update(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.updating)
+            self.updating = True
+            try:
+                await self.condition.wait_for(lambda: self.searching == 0)
+                if degrees.graph is None:
+                    affected = degrees.update_data(self.directory)
+                else:
+                    # The compact store is reloaded in full into new
+                    # objects, which are only swapped in at the end, so
+                    # reload in a worker thread and keep answering the
+                    # requests that do not search meanwhile
+                    loop = asyncio.get_running_loop()
+                    affected = await loop.run_in_executor(
+                        None, degrees.update_data, self.directory
+                    )
+                self.cache.invalidate(affected)
+            finally:
+                self.updating = False
+                self.condition.notify_all()
+        return {
+            "ok": True,
+            "affected": None if affected is None else len(affected)
+        }
+
+    async def path(self, source, target):
+        source = resolve(source)
+        target = resolve(target)
+        if source is None or target is None:
+            return {"ok": False, "error": "person not found"}
+
+        key = (source, target)
+        result = self.cache.get(key)
+        if result is None:
+            async with self.condition:
+                await self.condition.wait_for(lambda: not self.updating)
+                self.searching += 1
+            try:
+                # Search in a worker thread so the server keeps accepting
+                # and answering cached requests meanwhile
+                loop = asyncio.get_running_loop()
+                path = await loop.run_in_executor(
+                    None, degrees.bidirectional_path, source, target
+                )
+            finally:
+                async with self.condition:
+                    self.searching -= 1
+                    self.condition.notify_all()
+            result = {
+                "ok": True,
+                "source": source,
+                "target": target,
+                "degrees": None if path is None else len(path),
+                "path": path
+            }
+            self.cache.put(key, result)
+        return result
+
+
+def field(request, name):
+    """
+    Return `name` from `request` as a string, accepting numbers too,
+    as clients may send numeric person_ids as numbers.
+    """
+    value = request[name]
+    if isinstance(value, bool) or not isinstance(value, (str, int)):
+        raise ValueError(f"{name} must be a string")
+    return str(value)
+
+
+def resolve(person):
+    """
+    Return the person_id for `person`, a person_id or unambiguous name,
+    or None if there is no such person.
+    """
+    if person in degrees.people:
+        return person
+    return degrees.person_id_for_name(person, interactive=False)
+
+
+async def serve(address, directory):
+    server = DegreesServer(directory)
+    if isinstance(address, str):
+        listener = await asyncio.start_unix_server(server.handle, path=address)
+    else:
+        listener = await asyncio.start_server(server.handle, *address)
+    print(f"Serving on {address}.", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Answer degrees requests over a socket."
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="use the compact store"
+    )
+    cli.add_address_arguments(parser)
+    parser.add_argument("directory", nargs="?", default="large")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, compact=args.compact)
+    print("Data loaded.", file=sys.stderr)
+
+    try:
+        asyncio.run(serve(cli.address(args), args.directory))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
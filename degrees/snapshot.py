@@ -0,0 +1,124 @@
+import json
+import mmap
+import os
+import sys
+from array import array
+
+from graph import Graph, StringTable
+
+MAGIC = b"DEGSNAP1"
+
+# Graph arrays written to a snapshot, in order
+ARRAYS = [
+    "person_keys", "person_births", "person_offsets", "person_movies",
+    "movie_keys", "movie_years", "movie_offsets", "movie_stars",
+    "name_order"
+]
+TABLES = ["person_names", "movie_titles"]
+
+FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+
+def snapshot_path(directory):
+    return os.path.join(directory, "degrees.snapshot")
+
+
+def fingerprint(directory):
+    """
+    Return the (size, mtime) of each CSV file in `directory`, used to
+    tell whether a snapshot is still up to date.
+    """
+    result = []
+    for filename in FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        result.append([stat.st_size, stat.st_mtime_ns])
+    return result
+
+
+def load_graph(directory, progress=False):
+    """
+    Return the Graph for `directory`, memory-mapped from its snapshot if
+    the snapshot matches the CSV files, or parsed from the CSV files
+    (and snapshotted for next time) otherwise.
+    """
+    path = snapshot_path(directory)
+    current = fingerprint(directory)
+    graph = load(path, current)
+    if graph is None:
+        graph = Graph.from_csv(directory, progress)
+        try:
+            save(graph, path, current)
+        except OSError:
+            pass
+    return graph
+
+
+def save(graph, path, stamp):
+    """
+    Write `graph` to the snapshot file `path`, tagged with `stamp`.
+    """
+    sections = []
+    for name in ARRAYS:
+        sections.append((name, getattr(graph, name)))
+    for name in TABLES:
+        table = getattr(graph, name)
+        sections.append((f"{name}.blob", array("B", table.blob)))
+        sections.append((f"{name}.offsets", table.offsets))
+
+    # Lay out every section at an 8-byte aligned offset
+    layout = {}
+    offset = 0
+    for name, values in sections:
+        size = len(values) * values.itemsize
+        layout[name] = [values.typecode, offset, size]
+        offset += size + (-size % 8)
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "fingerprint": stamp,
+        "sections": layout
+    }).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+    start = len(MAGIC) + 8 + len(header)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, values in sections:
+            _, section_offset, size = layout[name]
+            f.seek(start + section_offset)
+            f.write(memoryview(values).cast("B"))
+        f.truncate(start + offset)
+    os.replace(tmp, path)
+
+
+def load(path, stamp):
+    """
+    Memory-map the snapshot file `path` and return it as a Graph.
+    Return None if there is no snapshot or it does not match `stamp`.
+    """
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+            if (header["byteorder"] != sys.byteorder
+                    or header["fingerprint"] != stamp):
+                return None
+            data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    except (OSError, ValueError):
+        return None
+
+    start = len(MAGIC) + 8 + length
+    views = {}
+    for name, (typecode, offset, size) in header["sections"].items():
+        views[name] = data[start + offset:start + offset + size].cast(typecode)
+
+    fields = {name: views[name] for name in ARRAYS}
+    for name in TABLES:
+        fields[name] = StringTable(
+            views[f"{name}.blob"], views[f"{name}.offsets"]
+        )
+    return Graph(**fields)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import cli
+import crawler
+import pagerank
+from linkgraph import LinkGraph
+from pagerank import DAMPING
+
+SAMPLES = 100000
+
+# Largest difference in any page's rank allowed between sampling and
+# iteration before the benchmark fails
+AGREEMENT = 0.02
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time each stage of ranking a corpus."
+    )
+    parser.add_argument(
+        "--memory", action="store_true", help="also measure peak memory"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "samples", nargs="?", type=cli.positive_int, default=SAMPLES
+    )
+    parser.add_argument("seed", nargs="?", type=int, default=0)
+    args = parser.parse_args()
+    directory, samples, seed = args.corpus, args.samples, args.seed
+    memory = args.memory
+
+    # Each stage is timed on its own, feeding its result to later ones
+    results = {}
+    corpus, results["crawl"] = run(pagerank.crawl, directory, memory=memory)
+    parallel, results["crawl-parallel"] = run(
+        crawler.crawl, directory, memory=memory
+    )
+    graph, results["build"] = run(
+        LinkGraph.from_corpus, corpus, memory=memory
+    )
+
+    random.seed(seed)
+    sampled, results["sample"] = run(
+        pagerank.sample_pagerank, corpus, DAMPING, samples, memory=memory
+    )
+    batch_sampled, results["sample-batch"] = run(
+        lambda: graph.to_dict(
+            graph.sample(DAMPING, samples, np.random.default_rng(seed))
+        ),
+        memory=memory
+    )
+    iterated, results["iterate"] = run(
+        pagerank.iterate_pagerank, corpus, DAMPING, memory=memory
+    )
+
+    agreement = {
+        "sample": compare(sampled, iterated),
+        "sample-batch": compare(batch_sampled, iterated),
+    }
+    report = {
+        "pages": graph.n,
+        "links": len(graph.targets),
+        "samples": samples,
+        "stages": results,
+        "agreement": agreement,
+        "crawlers": crawl_differences(corpus, parallel),
+    }
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(
+            f"{graph.n} pages, {len(graph.targets)} links, "
+            f"{samples} samples"
+        )
+        print(f"{'stage':<16}{'seconds':>12}{'peak KiB':>12}")
+        for name, result in results.items():
+            peak = "-" if result["peak"] is None else result["peak"] // 1024
+            print(f"{name:<16}{result['seconds']:>12.3f}{peak:>12}")
+        print(f"{'vs iteration':<16}{'total diff':>12}{'max diff':>12}")
+        for name, result in agreement.items():
+            print(
+                f"{name:<16}{result['total']:>12.4f}{result['max']:>12.4f}"
+            )
+        differences = report["crawlers"]
+        if any(differences.values()):
+            print(
+                f"Parallel crawl: +{differences['pages']} pages, "
+                f"+{differences['links']} links, "
+                f"-{differences['missing']} links"
+            )
+
+    if any(result["max"] > AGREEMENT for result in agreement.values()):
+        sys.exit("Sampling and iteration disagree.")
+
+
+def run(stage, *args, memory=False):
+    """
+    Run `stage` with `args`.
+    Return its result and a dictionary of its wall time and, if `memory`
+    is True, the peak memory it allocated (measured in a separate run,
+    as tracing slows it down).
+    """
+    start = time.perf_counter()
+    result = stage(*args)
+    stats = {"seconds": time.perf_counter() - start, "peak": None}
+    if memory:
+        tracemalloc.start()
+        stage(*args)
+        stats["peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, stats
+
+
+def crawl_differences(corpus, parallel):
+    """
+    Return how many pages and links the parallel crawler found that
+    `pagerank.crawl` did not, and how many of its links it missed. They
+    differ where the corpus has nested directories, or links that only
+    the parallel crawler resolves.
+    """
+    found = missing = 0
+    for page, links in parallel.items():
+        found += len(links - corpus.get(page, set()))
+    for page, links in corpus.items():
+        missing += len(links - parallel.get(page, set()))
+    return {
+        "pages": len(parallel.keys() - corpus.keys()),
+        "links": found,
+        "missing": missing,
+    }
+
+
+def compare(ranks, reference):
+    """
+    Return the total and largest difference between two dictionaries
+    of PageRank values.
+    """
+    differences = [abs(ranks[page] - reference[page]) for page in reference]
+    return {"total": sum(differences), "max": max(differences, default=0)}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+import argparse
+
+
+def positive_int(value):
+    """Parse a whole number of at least 1, as an argparse type."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+
+def positive_float(value):
+    """Parse a number greater than 0, as an argparse type."""
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0: {value}")
+    return number
@@ -0,0 +1,56 @@
+import argparse
+import os
+import time
+
+import numpy as np
+
+import cli
+import crawler
+from edgefile import EdgeFile
+from linkgraph import METHODS, LinkGraph
+from pagerank import DAMPING, MARGIN
+
+# How much tighter than the margin the reference ranks are computed
+REFERENCE = 1e-6
+
+
+def compare(graph, damping_factor, margin, methods=METHODS):
+    """
+    Run each of `methods` on `graph` to the given margin, and return a
+    list of (method, iterations, seconds, error) for each, where error
+    is the total difference from ranks converged far more tightly.
+    """
+    reference = graph.iterate(damping_factor, margin * REFERENCE)
+    results = []
+    for method in methods:
+        start = time.perf_counter()
+        ranks, iterations = graph.converge(
+            damping_factor, margin, method=method
+        )
+        seconds = time.perf_counter() - start
+        error = np.abs(ranks - reference).sum()
+        results.append((method, iterations, seconds, error))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the ways of iterating PageRank to convergence."
+    )
+    parser.add_argument("--margin", type=cli.positive_float, default=MARGIN)
+    parser.add_argument("source", metavar="corpus|edgefile")
+    args = parser.parse_args()
+    margin = args.margin
+
+    if os.path.isdir(args.source):
+        graph = LinkGraph.from_corpus(crawler.crawl(args.source))
+    else:
+        graph = EdgeFile(args.source)
+    print(f"{graph.n} pages, margin {margin}")
+    print(f"{'method':<14}{'iterations':>11}{'seconds':>10}{'error':>11}")
+    for method, iterations, seconds, error in compare(graph, DAMPING, margin):
+        print(f"{method:<14}{iterations:>11}{seconds:>10.3f}{error:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
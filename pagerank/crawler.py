@@ -0,0 +1,173 @@
+import argparse
+import os
+import posixpath
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import cli
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Files handed to each worker task, and tasks queued per worker
+CHUNK = 64
+QUEUED = 4
+
+
+def list_pages(directory):
+    """
+    Return the sorted names of all HTML pages under `directory`, including
+    nested directories, as "/"-separated paths relative to `directory`.
+    """
+    pages = []
+    for root, dirs, files in os.walk(directory):
+        relative = os.path.relpath(root, directory)
+        for filename in files:
+            if not filename.endswith(".html"):
+                continue
+            if relative != ".":
+                filename = os.path.join(relative, filename)
+            pages.append(filename.replace(os.sep, "/"))
+    pages.sort()
+    return pages
+
+
+def resolve(page, href):
+    """
+    Return the page name `href` refers to when it appears in `page`,
+    or None if it leaves the corpus (another site, or above its root).
+    Absolute paths are relative to the corpus root.
+    """
+    parts = urlsplit(href)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    if parts.path.startswith("/"):
+        path = posixpath.normpath(parts.path.lstrip("/"))
+    else:
+        path = posixpath.normpath(
+            posixpath.join(posixpath.dirname(page), parts.path)
+        )
+    if path.startswith("../") or path == "..":
+        return None
+    return path
+
+
+def page_links(directory, pages):
+    """
+    Return a list of (page, links) pairs for `pages`, where `links` is
+    the set of pages each one links to, other than itself.
+    """
+    results = []
+    for page in pages:
+        path = os.path.join(directory, page)
+        with open(path, encoding="utf-8", errors="replace") as f:
+            contents = f.read()
+        results.append((page, links_in(page, contents)))
+    return results
+
+
+def links_in(page, contents):
+    """
+    Return the set of pages linked to by the HTML `contents` of `page`,
+    other than itself.
+    """
+    links = set()
+    for href in LINK.findall(contents):
+        link = resolve(page, href)
+        if link is not None and link != page:
+            links.add(link)
+    return links
+
+
+def crawl_links(directory, workers=None, processes=False, pages=None):
+    """
+    Yield (page, links) for each page under `directory`, in sorted page
+    order, as files are parsed across a pool of `workers` threads (or
+    processes), one per CPU by default. Only links to pages in the
+    corpus are kept. `pages` may give the result of `list_pages` if it
+    is already known.
+
+    At most a few chunks of files per worker are in flight at once, so
+    memory use does not grow with the size of the corpus beyond its list
+    of page names.
+    """
+    if pages is None:
+        pages = list_pages(directory)
+    known = set(pages)
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(workers) as pool:
+        limit = QUEUED * workers
+        pending = deque()
+        for start in range(0, len(pages), CHUNK):
+            pending.append(
+                pool.submit(page_links, directory, pages[start:start + CHUNK])
+            )
+            if len(pending) >= limit:
+                yield from _known(pending.popleft().result(), known)
+        while pending:
+            yield from _known(pending.popleft().result(), known)
+
+
+def _known(results, known):
+    for page, links in results:
+        yield page, links & known
+
+
+def crawl(directory, workers=None, processes=False):
+    """
+    Same as `pagerank.crawl`, but parses pages in parallel and includes
+    pages in nested directories.
+    """
+    return dict(crawl_links(directory, workers, processes))
+
+
+def write_edges(directory, path, workers=None, processes=False):
+    """
+    Crawl `directory` straight into an edge list file at `path`: one
+    tab-separated line per link, from page to linked page, as well as a
+    line with just the page for each page without links.
+    Return the number of pages written.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for page, links in crawl_links(directory, workers, processes):
+            if links:
+                f.writelines(f"{page}\t{link}\n" for link in sorted(links))
+            else:
+                f.write(f"{page}\n")
+            count += 1
+    return count
+
+
+def read_edges(path):
+    """
+    Return the corpus dictionary stored in an edge list file.
+    """
+    corpus = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            page, *link = line.rstrip("\n").split("\t")
+            corpus.setdefault(page, set()).update(link)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Crawl a corpus into an edge list file."
+    )
+    parser.add_argument("--workers", type=cli.positive_int)
+    parser.add_argument(
+        "--processes", action="store_true",
+        help="parse pages in processes rather than threads"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("output")
+    args = parser.parse_args()
+    count = write_edges(args.corpus, args.output, args.workers, args.processes)
+    print(f"Wrote links for {count} pages to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+from collections.abc import Sequence
+
+import numpy as np
+
+import crawler
+from linkgraph import PageGraph
+from pagerank import DAMPING, MARGIN
+
+MAGIC = b"PRLINKS1"
+
+# Edges held in memory at once while building or ranking
+CHUNK = 1 << 22
+
+
+class PageNames(Sequence):
+    """Page names stored as one UTF-8 blob with the offset of each name."""
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+
+class EdgeFile(PageGraph):
+    """
+    A PageGraph memory-mapped from an edge file written by `build`.
+
+    Each update streams over the edges a chunk at a time, so only
+    per-page arrays like the ranks are held in memory, and graphs with
+    more links than fit in memory can still be ranked. Links are only
+    kept by target page, so unlike a LinkGraph it cannot be sampled.
+    """
+
+    def __init__(self, path, chunk=CHUNK):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an edge file")
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(f"{path} was written on another platform")
+        start = len(MAGIC) + 8 + length
+        sections = {
+            name: np.memmap(
+                path, dtype=dtype, mode="r", offset=start + offset,
+                shape=(count,)
+            ) if count else np.zeros(0, dtype=dtype)
+            for name, (dtype, offset, count) in header["sections"].items()
+        }
+
+        self.pages = PageNames(sections["names"], sections["name_offsets"])
+        self.sources = sections["sources"]
+        self.targets = sections["targets"]
+        self.n = header["n"]
+        self.m = header["m"]
+        self.chunk = chunk
+        self.out_degree = np.array(sections["out_degree"], dtype=np.int64)
+        self.dangling = self.out_degree == 0
+
+    def linked(self, shares, active=None):
+        linked = np.zeros(shares.shape)
+        for start in range(0, self.m, self.chunk):
+            targets = np.asarray(self.targets[start:start + self.chunk])
+
+            # Edges are sorted by target, so each chunk only adds to the
+            # pages between its first and last target, and can be skipped
+            # if none of those are active
+            first, last = int(targets[0]), int(targets[-1])
+            if active is not None and not active[first:last + 1].any():
+                continue
+            sources = np.asarray(self.sources[start:start + self.chunk])
+            targets = targets - first
+
+            # Each chunk is read once for every row of shares
+            for row, total in zip(shares.reshape(-1, self.n),
+                                  linked.reshape(-1, self.n)):
+                total[first:last + 1] += np.bincount(
+                    targets, weights=row[sources], minlength=last - first + 1
+                )
+        return linked
+
+
+def build(path, pages, edges, chunk=CHUNK):
+    """
+    Write an edge file to `path` for the given sorted list of `pages`
+    and iterable of (page, linked page) name pairs, ignoring links to
+    pages not in `pages`.
+
+    Edges are spilled to disk unsorted, partitioned into files by ranges
+    of target pages holding about `chunk` edges each, and each partition
+    is then sorted in memory, so at most a few chunks of edges are held
+    in memory at a time.
+    """
+    n = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    out_degree = np.zeros(n, dtype=np.int64)
+    in_degree = np.zeros(n, dtype=np.int64)
+    directory = os.path.dirname(os.path.abspath(path))
+
+    with tempfile.TemporaryDirectory(dir=directory) as scratch:
+        unsorted = os.path.join(scratch, "edges")
+        with open(unsorted, "wb") as f:
+            for pairs in _pairs(edges, index, chunk):
+                out_degree += np.bincount(pairs[:, 0], minlength=n)
+                in_degree += np.bincount(pairs[:, 1], minlength=n)
+                f.write(pairs.tobytes())
+        m = int(in_degree.sum())
+
+        # Split the target pages into ranges of about `chunk` edges
+        ends = np.cumsum(in_degree)
+        bounds = np.searchsorted(ends, np.arange(chunk, m, chunk)) + 1
+        bounds = np.unique(np.concatenate(([0], bounds[bounds < n], [n])))
+        parts = [
+            os.path.join(scratch, f"part{i}") for i in range(len(bounds) - 1)
+        ]
+        files = [open(part, "wb") for part in parts]
+        try:
+            with open(unsorted, "rb") as f:
+                while block := f.read(chunk * 8):
+                    pairs = np.frombuffer(block, dtype=np.int32)
+                    pairs = pairs.reshape(-1, 2)
+                    part = np.searchsorted(bounds, pairs[:, 1], "right") - 1
+                    order = np.argsort(part, kind="stable")
+                    counts = np.bincount(part, minlength=len(files))
+                    for file, group in zip(
+                        files, np.split(pairs[order], np.cumsum(counts)[:-1])
+                    ):
+                        if len(group):
+                            file.write(group.tobytes())
+        finally:
+            for file in files:
+                file.close()
+        os.remove(unsorted)
+
+        blob = bytearray()
+        name_offsets = np.zeros(n + 1, dtype=np.int64)
+        for i, page in enumerate(pages):
+            blob += page.encode("utf-8")
+            name_offsets[i + 1] = len(blob)
+        sections = [
+            ("out_degree", np.int32, n),
+            ("sources", np.int32, m),
+            ("targets", np.int32, m),
+            ("names", np.uint8, len(blob)),
+            ("name_offsets", np.int64, n + 1),
+        ]
+
+        # Lay out every section at an 8-byte aligned offset
+        layout = {}
+        offset = 0
+        for name, dtype, count in sections:
+            layout[name] = [np.dtype(dtype).str, offset, count]
+            size = count * np.dtype(dtype).itemsize
+            offset += size + (-size % 8)
+        header = json.dumps({
+            "byteorder": sys.byteorder,
+            "n": n,
+            "m": m,
+            "sections": layout
+        }).encode("utf-8")
+        header += b" " * (-(len(MAGIC) + 8 + len(header)) % 8)
+        start = len(MAGIC) + 8 + len(header)
+
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            f.truncate(start + offset)
+
+            def put(name, values, position=0):
+                """Write `values` into section `name` from `position` on."""
+                values = np.ascontiguousarray(values, dtype=layout[name][0])
+                f.seek(start + layout[name][1] + position * values.itemsize)
+                f.write(values.tobytes())
+
+            put("out_degree", out_degree)
+            put("names", np.frombuffer(bytes(blob), dtype=np.uint8))
+            put("name_offsets", name_offsets)
+
+            # Sort each partition by target page in turn and append it
+            written = 0
+            for part in parts:
+                pairs = np.fromfile(part, dtype=np.int32).reshape(-1, 2)
+                os.remove(part)
+                pairs = pairs[np.argsort(pairs[:, 1], kind="stable")]
+                put("sources", pairs[:, 0], written)
+                put("targets", pairs[:, 1], written)
+                written += len(pairs)
+        os.replace(tmp, path)
+
+
+def _pairs(edges, index, chunk):
+    """
+    Yield arrays of up to `chunk` (source, target) page numbers from
+    `edges`, skipping links to unknown pages.
+    """
+    pairs = []
+    for page, link in edges:
+        target = index.get(link)
+        if target is not None:
+            pairs.append((index[page], target))
+            if len(pairs) == chunk:
+                yield np.array(pairs, dtype=np.int32)
+                pairs = []
+    if pairs:
+        yield np.array(pairs, dtype=np.int32)
+
+
+def corpus_edges(directory):
+    """
+    Return the sorted pages of the corpus in `directory` and an iterator
+    over its links, parsed as they are needed.
+    """
+    pages = crawler.list_pages(directory)
+    edges = (
+        (page, link)
+        for page, links in crawler.crawl_links(directory, pages=pages)
+        for link in links
+    )
+    return pages, edges
+
+
+def edge_list_edges(path):
+    """
+    Return the sorted pages of an edge list file written by
+    `crawler.write_edges` and an iterator over its links, read from the
+    file as they are needed.
+    """
+    pages = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            pages.add(line.rstrip("\n").split("\t", 1)[0])
+
+    def edges():
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                page, *link = line.rstrip("\n").split("\t")
+                if link:
+                    yield page, link[0]
+
+    return sorted(pages), edges()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build or rank an on-disk edge file."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser(
+        "build", help="write an edge file from a corpus or edge list"
+    )
+    build_parser.add_argument("source", metavar="corpus|edgelist")
+    build_parser.add_argument("edgefile")
+    commands.add_parser("rank", help="rank an edge file").add_argument(
+        "edgefile"
+    )
+    args = parser.parse_args()
+
+    if args.command == "build":
+        if os.path.isdir(args.source):
+            pages, edges = corpus_edges(args.source)
+        else:
+            pages, edges = edge_list_edges(args.source)
+        build(args.edgefile, pages, edges)
+        graph = EdgeFile(args.edgefile)
+        print(
+            f"Wrote {graph.m} links between {graph.n} pages to "
+            f"{args.edgefile}."
+        )
+    else:
+        graph = EdgeFile(args.edgefile)
+        ranks = graph.iterate(DAMPING, MARGIN)
+        print(f"PageRank Results from Iteration")
+        for page, rank in zip(graph.pages, ranks):
+            print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
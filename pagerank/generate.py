@@ -0,0 +1,111 @@
+import argparse
+import os
+
+import numpy as np
+
+import cli
+
+# Average links per page, and how steeply links favour popular pages
+LINKS = 10
+EXPONENT = 1.0
+
+# Shape of the out-degree distribution (lower means a heavier tail)
+OUT_SHAPE = 2.5
+
+# Pages whose links are drawn at a time
+CHUNK = 10000
+
+
+def power_law_links(n, links=LINKS, exponent=EXPONENT, seed=0):
+    """
+    Yield (page, linked pages) for each of `n` pages numbered from 0,
+    where linked pages is a set of page numbers.
+
+    Like links on the web, a few pages are linked to far more than
+    others: each link goes to the page of popularity rank r with
+    probability proportional to r ** -exponent. The number of links on
+    each page is heavy-tailed too, averaging about `links`, and some
+    pages have none.
+    """
+    rng = np.random.default_rng(seed)
+    popularity = rng.permutation(n)
+    weights = (popularity + 1.0) ** -exponent
+    cumulative = np.cumsum(weights / weights.sum())
+    cumulative[-1] = 1
+
+    for start in range(0, n, CHUNK):
+        count = min(CHUNK, n - start)
+        degrees = np.minimum(
+            rng.pareto(OUT_SHAPE, count) * links * (OUT_SHAPE - 1), n - 1
+        ).astype(np.int64)
+        targets = np.searchsorted(cumulative, rng.random(degrees.sum()))
+        offsets = np.concatenate(([0], np.cumsum(degrees)))
+        for i in range(count):
+            page = start + i
+            linked = set(targets[offsets[i]:offsets[i + 1]].tolist())
+            linked.discard(page)
+            yield page, linked
+
+
+def page_name(page):
+    return f"{page}.html"
+
+
+def write_corpus(directory, n, links=LINKS, exponent=EXPONENT, seed=0):
+    """
+    Write a corpus of `n` HTML pages with power-law links to `directory`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, linked in power_law_links(n, links, exponent, seed):
+        anchors = "".join(
+            f'    <a href="{page_name(link)}">Page {link}</a>\n'
+            for link in sorted(linked)
+        )
+        with open(os.path.join(directory, page_name(page)), "w") as f:
+            f.write(
+                f"<!DOCTYPE html>\n<html>\n<head>\n"
+                f"    <title>Page {page}</title>\n</head>\n<body>\n"
+                f"{anchors}</body>\n</html>\n"
+            )
+
+
+def write_edge_list(path, n, links=LINKS, exponent=EXPONENT, seed=0):
+    """
+    Write the links of a corpus of `n` pages with power-law links to an
+    edge list file in the format of `crawler.write_edges`, without
+    writing the pages themselves.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for page, linked in power_law_links(n, links, exponent, seed):
+            name = page_name(page)
+            if linked:
+                f.writelines(
+                    f"{name}\t{page_name(link)}\n" for link in sorted(linked)
+                )
+            else:
+                f.write(f"{name}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a corpus of pages with power-law links."
+    )
+    parser.add_argument(
+        "--edges", action="store_true",
+        help="write only an edge list, not the pages"
+    )
+    parser.add_argument("--links", type=cli.positive_int, default=LINKS)
+    parser.add_argument("--exponent", type=float, default=EXPONENT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("pages", type=cli.positive_int)
+    parser.add_argument("output")
+    args = parser.parse_args()
+    options = dict(links=args.links, exponent=args.exponent, seed=args.seed)
+    if args.edges:
+        write_edge_list(args.output, args.pages, **options)
+    else:
+        write_corpus(args.output, args.pages, **options)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+import crawler
+from linkgraph import LinkGraph
+from pagerank import DAMPING, MARGIN
+
+# Arrays saved in a state file
+FIELDS = [
+    "pages", "sizes", "mtimes", "digests", "sources", "targets",
+    "missing_sources", "missing_names", "ranks"
+]
+
+
+def state_path(directory):
+    return os.path.join(directory, "pagerank.npz")
+
+
+class CorpusState():
+    """
+    What is known about a corpus from the last time its PageRank was
+    computed: each page's size, modification time and content digest
+    when it was read, its links, and the ranks computed then.
+
+    Links are edges from `sources[e]` to `targets[e]`, numbered like
+    `pages`. Links to names that were not pages of the corpus at the
+    time are kept apart as `missing_sources` and `missing_names`, in
+    case such a page is added later.
+    """
+
+    def __init__(self, pages, sizes, mtimes, digests, sources, targets,
+                 missing_sources, missing_names, ranks):
+        self.pages = pages
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.digests = digests
+        self.sources = sources
+        self.targets = targets
+        self.missing_sources = missing_sources
+        self.missing_names = missing_names
+        self.ranks = ranks
+
+    @classmethod
+    def empty(cls):
+        none = np.zeros(0, dtype=np.int64)
+        return cls([], none, none, np.zeros(0, dtype="V20"), none, none,
+                   none, [], np.zeros(0))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Return the state saved at `path`, or an empty state if there is
+        no usable state file.
+        """
+        try:
+            with np.load(path) as data:
+                fields = {name: data[name] for name in FIELDS}
+            fields["digests"] = fields["digests"].view("V20")
+        except (OSError, ValueError, KeyError):
+            return cls.empty()
+        fields["pages"] = fields["pages"].tolist()
+        fields["missing_names"] = fields["missing_names"].tolist()
+        return cls(**fields)
+
+    def save(self, path):
+        fields = {name: getattr(self, name) for name in FIELDS}
+        fields["pages"] = np.array(self.pages, dtype=str)
+        fields["missing_names"] = np.array(self.missing_names, dtype=str)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **fields)
+        os.replace(tmp, path)
+
+
+def stat_pages(directory, pages):
+    """Return arrays of the sizes and modification times of `pages`."""
+    sizes = np.empty(len(pages), dtype=np.int64)
+    mtimes = np.empty(len(pages), dtype=np.int64)
+    for i, page in enumerate(pages):
+        stat = os.stat(os.path.join(directory, page))
+        sizes[i] = stat.st_size
+        mtimes[i] = stat.st_mtime_ns
+    return sizes, mtimes
+
+
+def read_page(directory, page):
+    """Return the digest of `page` and the set of pages it links to."""
+    with open(os.path.join(directory, page), "rb") as f:
+        contents = f.read()
+    digest = hashlib.sha1(contents).digest()
+    return digest, crawler.links_in(
+        page, contents.decode("utf-8", errors="replace")
+    )
+
+
+def update(directory, state, damping_factor=DAMPING, margin=MARGIN):
+    """
+    Bring `state` up to date with the corpus in `directory`, rereading
+    only pages whose size or modification time changed, and rebuilding
+    only the links of pages whose contents changed. The iteration starts
+    from the previous ranks rather than from equal ranks.
+
+    Return the new state, the LinkGraph and the number of pages whose
+    contents were read.
+    """
+    pages = crawler.list_pages(directory)
+    n = len(pages)
+    index = {page: i for i, page in enumerate(pages)}
+    sizes, mtimes = stat_pages(directory, pages)
+
+    # Where each previously known page is numbered now, or -1 if it is gone
+    moved = np.array(
+        [index.get(page, -1) for page in state.pages], dtype=np.int64
+    )
+    kept = moved >= 0
+    seen = np.zeros(n, dtype=bool)
+    seen[moved[kept]] = True
+    old_sizes = np.full(n, -1, dtype=np.int64)
+    old_sizes[moved[kept]] = state.sizes[kept]
+    old_mtimes = np.full(n, -1, dtype=np.int64)
+    old_mtimes[moved[kept]] = state.mtimes[kept]
+    digests = np.zeros(n, dtype="V20")
+    digests[moved[kept]] = state.digests[kept]
+
+    # Reread pages that look different, and keep the links of those whose
+    # contents are the same as before
+    touched = np.flatnonzero((sizes != old_sizes) | (mtimes != old_mtimes))
+    with ThreadPoolExecutor() as pool:
+        results = pool.map(
+            read_page, repeat(directory), [pages[i] for i in touched]
+        )
+        stale = np.zeros(n, dtype=bool)
+        new_links = []
+        for i, (digest, links) in zip(touched, results):
+            if seen[i] and digest == digests[i].tobytes():
+                continue
+            digests[i] = digest
+            stale[i] = True
+            new_links.append((i, links))
+
+    # Links from unchanged pages carry over under their new numbers; those
+    # to deleted pages become missing, and missing ones to added pages
+    # are restored
+    sources = moved[state.sources]
+    targets = moved[state.targets]
+    keep = sources >= 0
+    keep[keep] = ~stale[sources[keep]]
+    gone = keep & (targets < 0)
+    missing = [
+        (source, state.pages[target]) for source, target in
+        zip(sources[gone].tolist(), state.targets[gone].tolist())
+    ]
+    keep &= targets >= 0
+    sources = [sources[keep]]
+    targets = [targets[keep]]
+
+    for source, name in zip(state.missing_sources.tolist(),
+                            state.missing_names):
+        source = int(moved[source])
+        if source >= 0 and not stale[source]:
+            missing.append((source, name))
+    for i, links in new_links:
+        missing.extend((i, link) for link in links)
+
+    restored = [
+        (source, index[name]) for source, name in missing if name in index
+    ]
+    missing = [(source, name) for source, name in missing if name not in index]
+    if restored:
+        restored = np.array(restored, dtype=np.int64)
+        sources.append(restored[:, 0])
+        targets.append(restored[:, 1])
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+    order = np.argsort(targets, kind="stable")
+    graph = LinkGraph(pages, sources[order], targets[order])
+
+    # Start from the previous ranks, with pages added since at equal rank
+    ranks = np.full(n, 1 / n)
+    ranks[moved[kept]] = state.ranks[kept]
+    ranks /= ranks.sum()
+    ranks = graph.iterate(damping_factor, margin, ranks)
+
+    state = CorpusState(
+        pages, sizes, mtimes, digests, graph.sources, graph.targets,
+        np.array([source for source, _ in missing], dtype=np.int64),
+        [name for _, name in missing], ranks
+    )
+    return state, graph, len(touched)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank a corpus, rereading only pages changed since "
+        "the last run."
+    )
+    parser.add_argument("corpus")
+    directory = parser.parse_args().corpus
+    start = time.perf_counter()
+    path = state_path(directory)
+    state, graph, read = update(directory, CorpusState.load(path))
+    state.save(path)
+    print(
+        f"Read {read} of {graph.n} pages in "
+        f"{time.perf_counter() - start:.2f} seconds.",
+        file=sys.stderr
+    )
+    print(f"PageRank Results from Iteration")
+    for page, rank in zip(state.pages, state.ranks):
+        print(f"  {page}: {rank:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+import numpy as np
+
+# Number of random walks advanced together when sampling
+WALKERS = 100000
+
+# Ways to update ranks until they converge
+METHODS = ["jacobi", "gauss-seidel", "aitken", "quadratic", "adaptive"]
+
+# Blocks of pages updated in turn by Gauss-Seidel updates
+BLOCKS = 256
+
+# Updates between extrapolations
+EXTRAPOLATE = 10
+
+# Teleport vectors ranked together
+BATCH = 8
+
+# Fraction of the average change per page below which pages are frozen
+FREEZE = 0.1
+
+# Updates in a row a page must stay within that change to be frozen
+SETTLE = 3
+
+
+class PageGraph():
+    """
+    Pages numbered by their position in `pages`, and the links between
+    them, which subclasses store in their own way. Each subclass sets
+    `pages`, `n`, `out_degree`, `dangling` (pages with no links, treated
+    as linking to every page), and `sources` and `targets` (the links
+    as edges from `sources[e]` to `targets[e]`, sorted by target page),
+    and provides `linked`.
+    """
+
+    def linked(self, shares, active=None):
+        """
+        Return the total share each page receives over its incoming links.
+        If `active` is given, only the totals of pages where it is True
+        are needed, and links into other pages may be left out.
+
+        `shares` may also hold one row of shares per rank vector, in
+        which case one row of totals is returned for each, following
+        the links once for all of them.
+        """
+        raise NotImplementedError
+
+    def step(self, ranks, damping_factor):
+        """
+        Return the ranks after one PageRank update of `ranks`.
+        """
+        # Share of each linking page's rank passed along each of its links
+        shares = np.divide(
+            ranks, self.out_degree,
+            out=np.zeros(self.n), where=~self.dangling
+        )
+        linked = self.linked(shares)
+        # Dangling pages spread their rank over every page equally
+        spread = ranks[self.dangling].sum() / self.n
+        return (1 - damping_factor) / self.n + damping_factor * (linked + spread)
+
+    def iterate(self, damping_factor, margin, ranks=None, method="jacobi"):
+        """
+        Starting from `ranks`, or equal ranks if not given, update the
+        ranks with the given method (one of `METHODS`) until the total
+        change in one update is at most `margin`.
+        Return the ranks as an array ordered like `pages`.
+        """
+        return self.converge(damping_factor, margin, ranks, method)[0]
+
+    def converge(self, damping_factor, margin, ranks=None, method="jacobi"):
+        """
+        Same as `iterate`, but return both the ranks and the number of
+        updates it took.
+        """
+        if ranks is None:
+            ranks = np.full(self.n, 1 / self.n)
+        if method == "jacobi":
+            return self.jacobi(damping_factor, margin, ranks)
+        elif method == "gauss-seidel":
+            return self.gauss_seidel(damping_factor, margin, ranks)
+        elif method in ["aitken", "quadratic"]:
+            return self.extrapolated(damping_factor, margin, ranks, method)
+        elif method == "adaptive":
+            return self.adaptive(damping_factor, margin, ranks)
+        raise ValueError(f"unknown method: {method}")
+
+    def jacobi(self, damping_factor, margin, ranks):
+        """Update all ranks together from the previous ranks."""
+        iterations = 0
+        while True:
+            new_ranks = self.step(ranks, damping_factor)
+            iterations += 1
+            change = np.abs(new_ranks - ranks).sum()
+            ranks = new_ranks
+            if change <= margin:
+                return ranks, iterations
+
+    def gauss_seidel(self, damping_factor, margin, ranks, blocks=BLOCKS):
+        """
+        Update the ranks a block of pages at a time, each block using
+        the ranks already updated in earlier blocks.
+        """
+        ranks = ranks.copy()
+        shares = np.divide(
+            ranks, self.out_degree, out=np.zeros(self.n), where=~self.dangling
+        )
+        # Edges into the pages of each block are a contiguous run, since
+        # they are sorted by target
+        bounds = np.linspace(0, self.n, min(blocks, self.n) + 1)
+        bounds = bounds.astype(np.int64)
+        edges = np.searchsorted(self.targets, bounds)
+        iterations = 0
+        while True:
+            iterations += 1
+            previous = ranks.copy()
+            spread = ranks[self.dangling].sum() / self.n
+            for i in range(len(bounds) - 1):
+                start, end = bounds[i], bounds[i + 1]
+                first, last = edges[i], edges[i + 1]
+                linked = np.bincount(
+                    self.targets[first:last] - start,
+                    weights=shares[self.sources[first:last]],
+                    minlength=end - start
+                )
+                new_ranks = (
+                    (1 - damping_factor) / self.n
+                    + damping_factor * (linked + spread)
+                )
+                difference = new_ranks - ranks[start:end]
+                spread += difference[self.dangling[start:end]].sum() / self.n
+                ranks[start:end] = new_ranks
+                np.divide(
+                    new_ranks, self.out_degree[start:end],
+                    out=shares[start:end], where=~self.dangling[start:end]
+                )
+
+            # Unlike updating all pages together, a sweep does not keep
+            # the ranks summing to 1, and without rescaling that error
+            # would only shrink by `damping_factor` per sweep
+            total = ranks.sum()
+            ranks /= total
+            shares /= total
+            if np.abs(ranks - previous).sum() <= margin:
+                return ranks, iterations
+
+    def extrapolated(self, damping_factor, margin, ranks, method,
+                     every=EXTRAPOLATE):
+        """
+        Update all ranks together, but every `every` updates replace the
+        ranks with an extrapolation of where the latest ones are heading:
+        Aitken's delta-squared per page from the last three, or quadratic
+        extrapolation from the last four.
+        """
+        history = [ranks]
+        needed = 3 if method == "aitken" else 4
+        iterations = 0
+        while True:
+            new_ranks = self.step(ranks, damping_factor)
+            iterations += 1
+            change = np.abs(new_ranks - ranks).sum()
+            ranks = new_ranks
+            if change <= margin:
+                return ranks, iterations
+            history = history[-(needed - 1):] + [ranks]
+            if iterations % every == 0 and len(history) == needed:
+                if method == "aitken":
+                    ranks = _aitken(*history)
+                else:
+                    ranks = _quadratic(*history)
+                history = [ranks]
+
+    def adaptive(self, damping_factor, margin, ranks, freeze=FREEZE,
+                 settle=SETTLE):
+        """
+        Update all ranks together, but stop updating pages once their
+        rank has changed by at most `freeze` times the average change
+        allowed per page in `settle` updates in a row, and drop links into
+        those pages from the updates. Once the rest converge, all pages
+        are updated again until they converge together.
+        """
+        threshold = freeze * margin / self.n
+        active = np.ones(self.n, dtype=bool)
+        calm = np.zeros(self.n, dtype=np.int64)
+        iterations = 0
+        while True:
+            shares = np.divide(
+                ranks, self.out_degree,
+                out=np.zeros(self.n), where=~self.dangling
+            )
+            linked = self.linked(shares, None if active.all() else active)
+            spread = ranks[self.dangling].sum() / self.n
+            new_ranks = ranks.copy()
+            new_ranks[active] = (
+                (1 - damping_factor) / self.n
+                + damping_factor * (linked[active] + spread)
+            )
+            iterations += 1
+            difference = np.abs(new_ranks - ranks)
+            ranks = new_ranks
+            if difference.sum() <= margin:
+                if active.all():
+                    return ranks / ranks.sum(), iterations
+
+                # Frozen pages may have drifted since, so only stop once
+                # an update of every page changes little enough
+                active[:] = True
+                calm[:] = 0
+                continue
+            calm = np.where(difference <= threshold, calm + 1, 0)
+            active &= calm < settle
+
+    def personalized(self, teleports, damping_factor, margin, batch=BATCH):
+        """
+        Return personalized PageRank for each row of `teleports`, an
+        array of page weights ordered like `pages`. Each row gives the
+        chances of the random surfer jumping to each page instead of a
+        uniformly random page (including from pages with no links).
+
+        Rows are ranked `batch` at a time, updating all of them together
+        until each has converged to within `margin`, and the ranks are
+        returned as an array shaped like `teleports`.
+        """
+        teleports = np.array(teleports, dtype=float).reshape(-1, self.n)
+        totals = teleports.sum(axis=1, keepdims=True)
+        if (teleports < 0).any() or not (totals > 0).all():
+            raise ValueError("teleport weights must be positive")
+        teleports /= totals
+        ranks = teleports.copy()
+        for start in range(0, len(teleports), batch):
+            rows = slice(start, start + batch)
+            self._personalized(
+                ranks[rows], teleports[rows], damping_factor, margin
+            )
+        return ranks
+
+    def _personalized(self, ranks, teleports, damping_factor, margin):
+        """Update the rows of `ranks` in place until each converges."""
+        active = np.arange(len(ranks))
+        while active.size:
+            current = ranks[active]
+            shares = np.divide(
+                current, self.out_degree,
+                out=np.zeros_like(current), where=~self.dangling
+            )
+            linked = self.linked(shares)
+            spread = current[:, self.dangling].sum(axis=1, keepdims=True)
+            new_ranks = (
+                (1 - damping_factor) * teleports[active]
+                + damping_factor * (linked + spread * teleports[active])
+            )
+            change = np.abs(new_ranks - current).sum(axis=1)
+            ranks[active] = new_ranks
+            active = active[change > margin]
+
+    def to_dict(self, ranks):
+        """Return `ranks` as a dictionary mapping page names to ranks."""
+        return {page: float(rank) for page, rank in zip(self.pages, ranks)}
+
+
+class LinkGraph(PageGraph):
+    """
+    A corpus as NumPy arrays in memory: pages are numbered by their
+    position in `pages`, and each link is an edge from `sources[e]` to
+    `targets[e]`, with edges sorted by target page. The links are also
+    grouped by source page, so random walks can follow them.
+    """
+
+    def __init__(self, pages, sources, targets):
+        self.pages = pages
+        self.sources = sources
+        self.targets = targets
+        self.n = len(pages)
+        self.out_degree = np.bincount(sources, minlength=self.n)
+
+        # Pages with no links are treated as linking to every page
+        self.dangling = self.out_degree == 0
+
+        # The same links grouped by source page: the pages linked to by
+        # page `i` are `out_links[out_offsets[i]:out_offsets[i + 1]]`
+        order = np.argsort(sources, kind="stable")
+        self.out_links = targets[order]
+        self.out_offsets = np.concatenate(([0], np.cumsum(self.out_degree)))
+
+        # The links last kept by `linked` for a set of active pages
+        self.kept = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a LinkGraph from a dictionary mapping each page to the set
+        of pages it links to, as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        edges = np.array(
+            [
+                (index[page], index[link])
+                for page in pages
+                for link in corpus[page]
+            ],
+            dtype=np.int64
+        ).reshape(-1, 2)
+        edges = edges[np.argsort(edges[:, 1], kind="stable")]
+        return cls(pages, edges[:, 0].copy(), edges[:, 1].copy())
+
+    def linked(self, shares, active=None):
+        if active is None:
+            self.kept = None
+            sources, targets = self.sources, self.targets
+        else:
+            sources, targets = self.links_into(active)
+        # NumPy has no sparse matrix product, and summing every row over
+        # each page's links at once is slower than one bincount per row
+        linked = np.stack([
+            np.bincount(targets, weights=row[sources], minlength=self.n)
+            for row in shares.reshape(-1, self.n)
+        ])
+        return linked.reshape(shares.shape)
+
+    def links_into(self, active):
+        """
+        Return the sources and targets of links including every link
+        into the pages where `active` is True. While the active pages
+        only shrink, links are only filtered again once a quarter of the
+        pages last filtered for are no longer active.
+        """
+        if self.kept is None or (active & ~self.kept[0]).any():
+            self.kept = (None, self.n, self.sources, self.targets)
+        _, counted, sources, targets = self.kept
+        if active.sum() < counted * 3 / 4:
+            keep = active[targets]
+            self.kept = (
+                active.copy(), active.sum(), sources[keep], targets[keep]
+            )
+        else:
+            self.kept = (active.copy(), counted, sources, targets)
+        return self.kept[2], self.kept[3]
+
+    def sample(self, damping_factor, n, rng=None, walkers=WALKERS):
+        """
+        Estimate PageRank from `n` samples, advancing up to `walkers`
+        random walks at once. Return the ranks as an array ordered like
+        `pages`.
+
+        Jumping to a random page (by choice or from a page with no links)
+        restarts the random surfer from a uniformly random page, so the
+        surfer's path is a series of independent walks that each start
+        at a random page and stop at their first jump. Counting the
+        pages visited by whole walks estimates the same distribution as
+        one long surf, without any warm-up.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        counts = np.zeros(self.n, dtype=np.int64)
+        total = 0
+        while total < n:
+            # Each walk visits about 1 / (1 - damping_factor) pages, so
+            # start only about as many walks as the samples still needed
+            walks = int(np.ceil((n - total) * (1 - damping_factor)))
+            counts += self.walk(
+                damping_factor, min(walkers, max(walks, 1)), rng, n - total
+            )
+            total = counts.sum()
+        return counts / total
+
+    def walk(self, damping_factor, walks, rng, limit=None):
+        """
+        Run `walks` independent walks, each from a uniformly random page
+        until its first jump, advancing them all at once.
+        Return the number of times each page was visited, counting only
+        the first `limit` visits if given, as if the walks were taken
+        one after another.
+        """
+        pages = rng.integers(0, self.n, walks)
+        walkers = np.arange(walks)
+        visited = []
+        owners = []
+        while pages.size:
+            visited.append(pages)
+            owners.append(walkers)
+            # Each walk follows a random link with probability
+            # `damping_factor` if it can, and stops otherwise
+            follow = (rng.random(pages.size) < damping_factor)
+            follow &= ~self.dangling[pages]
+            pages = pages[follow]
+            walkers = walkers[follow]
+            choice = (rng.random(pages.size) * self.out_degree[pages])
+            pages = self.out_links[
+                self.out_offsets[pages] + choice.astype(np.int64)
+            ]
+        visited = np.concatenate(visited)
+        if limit is not None and visited.size > limit:
+            # Keep whole walks in order, cutting the last one kept short;
+            # visits are in step order, so the kept steps of the last
+            # walk are its first ones
+            owners = np.concatenate(owners)
+            ends = np.cumsum(np.bincount(owners, minlength=walks))
+            last = np.searchsorted(ends, limit)
+            keep = owners < last
+            cut = np.flatnonzero(owners == last)
+            keep[cut[:limit - keep.sum()]] = True
+            visited = visited[keep]
+        return np.bincount(visited, minlength=self.n)
+
+def _aitken(x0, x1, x2):
+    """
+    Return Aitken's delta-squared extrapolation of each page's rank from
+    three successive rank vectors, keeping the latest rank where that
+    is undefined or not positive.
+    """
+    second = x2 - 2 * x1 + x0
+    ranks = x2.copy()
+    usable = np.abs(second) > 1e-300
+    ranks[usable] = x0[usable] - (x1 - x0)[usable] ** 2 / second[usable]
+    ranks = np.where(ranks > 0, ranks, x2)
+    return ranks / ranks.sum()
+
+
+def _quadratic(x0, x1, x2, x3):
+    """
+    Return the quadratic extrapolation of four successive rank vectors,
+    which assumes the error lies in the span of the two slowest-decaying
+    directions and cancels it (Kamvar et al., 2003).
+    """
+    y = np.stack([x1 - x0, x2 - x0], axis=1)
+    gamma = np.linalg.lstsq(y, -(x3 - x0), rcond=None)[0]
+    gamma1, gamma2 = gamma
+    beta0, beta1, beta2 = gamma1 + gamma2 + 1, gamma2 + 1, 1
+    ranks = beta0 * x1 + beta1 * x2 + beta2 * x3
+    ranks = np.where(ranks > 0, ranks, x3)
+    return ranks / ranks.sum()
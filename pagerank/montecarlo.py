@@ -0,0 +1,126 @@
+import argparse
+import multiprocessing
+import os
+from collections import deque
+
+import numpy as np
+
+import cli
+import pagerank
+from linkgraph import LinkGraph
+from pagerank import DAMPING
+
+# Standard error each page's rank is estimated to by default
+ERROR = 0.0005
+
+# Walks per batch; each batch gives one independent estimate of the ranks
+WALKS = 5000
+
+# Batches needed before their spread is trusted as an error estimate,
+# and samples after which sampling stops regardless
+MIN_BATCHES = 30
+LIMIT = 10 ** 9
+
+# The graph sampled by worker processes
+graph = None
+
+
+def estimate(link_graph, damping_factor, error=ERROR, workers=None,
+             seed=None, walks=WALKS, limit=LIMIT):
+    """
+    Estimate PageRank by sampling batches of `walks` random walks across
+    `workers` processes, until the standard error of every page's rank
+    is at most `error` or `limit` pages have been sampled.
+
+    Each batch is an independent estimate of the ranks, so the standard
+    error of a page's rank is estimated from the spread of its rank over
+    the batches (the batch means method).
+    Return the ranks, their standard errors and the number of samples.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    seeds = np.random.SeedSequence(seed)
+    counts = np.zeros(link_graph.n, dtype=np.int64)
+    batches = 0
+    mean = np.zeros(link_graph.n)
+    squares = np.zeros(link_graph.n)
+    errors = np.full(link_graph.n, np.inf)
+
+    results = _batches(link_graph, damping_factor, walks, seeds, workers)
+    try:
+        for batch in results:
+            counts += batch
+            batches += 1
+
+            # Update the mean and sum of squared deviations of the
+            # estimates from each batch (Welford's method)
+            ranks = batch / batch.sum()
+            delta = ranks - mean
+            mean += delta / batches
+            squares += delta * (ranks - mean)
+            if batches >= MIN_BATCHES:
+                errors = np.sqrt(squares / (batches - 1) / batches)
+                if errors.max() <= error or counts.sum() >= limit:
+                    break
+    finally:
+        results.close()
+    return counts / counts.sum(), errors, int(counts.sum())
+
+
+def _batches(link_graph, damping_factor, walks, seeds, workers):
+    """
+    Yield the visit counts of batches of random walks for as long as
+    they are asked for, running them across `workers` processes.
+    """
+    if workers == 1:
+        while True:
+            rng = np.random.default_rng(seeds.spawn(1)[0])
+            yield link_graph.walk(damping_factor, walks, rng)
+
+    # Workers are forked so they share the graph; where fork is not
+    # available, each worker is sent its own copy
+    if "fork" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, _share, (link_graph,)) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                pending.append(pool.apply_async(
+                    _walk, (damping_factor, walks, seeds.spawn(1)[0])
+                ))
+            yield pending.popleft().get()
+
+
+def _share(link_graph):
+    global graph
+    graph = link_graph
+
+
+def _walk(damping_factor, walks, seed):
+    return graph.walk(damping_factor, walks, np.random.default_rng(seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Estimate PageRank by sampling to a target error."
+    )
+    parser.add_argument("--workers", type=cli.positive_int)
+    parser.add_argument("--error", type=cli.positive_float, default=ERROR)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("corpus")
+    args = parser.parse_args()
+    link_graph = LinkGraph.from_corpus(pagerank.crawl(args.corpus))
+    ranks, errors, samples = estimate(
+        link_graph, DAMPING, args.error, args.workers, args.seed
+    )
+    print(f"PageRank Results from Sampling (n = {samples})")
+    for page, rank, error in zip(link_graph.pages, ranks, errors):
+        print(f"  {page}: {rank:.4f} ± {error:.4f}")
+
+
+if __name__ == "__main__":
+    main()
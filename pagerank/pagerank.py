@@ -1,7 +1,13 @@
+import argparse
 import os
 import random
 import re
-import sys
+
+import numpy as np
+
+import cli
+import crawler
+from linkgraph import METHODS, LinkGraph
 
 DAMPING = 0.85
 SAMPLES = 10000
@@ -9,14 +15,34 @@ MARGIN = 0.001
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    parser = argparse.ArgumentParser(
+        description="Rank the pages of a corpus by sampling and iteration."
+    )
+    parser.add_argument(
+        "--batch", action="store_true", help="sample many walks at once"
+    )
+    parser.add_argument(
+        "--parallel", action="store_true", help="crawl pages in parallel"
+    )
+    parser.add_argument("--method", choices=METHODS, default="jacobi")
+    parser.add_argument("corpus")
+    parser.add_argument(
+        "samples", nargs="?", type=cli.positive_int, default=SAMPLES
+    )
+    args = parser.parse_args()
+    if args.parallel:
+        corpus = crawler.crawl(args.corpus)
+    else:
+        corpus = crawl(args.corpus)
+    samples = args.samples
+    if args.batch:
+        ranks = batch_sample_pagerank(corpus, DAMPING, samples)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, samples)
+    print(f"PageRank Results from Sampling (n = {samples})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank(corpus, DAMPING, args.method)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -89,71 +115,78 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    """
-    corpus = {"1.html": {"2.html", "3.html"}, "2.html": {"3.html"}, "3.html": {"2.html"}}
-    damping_factor = .85
-    n = 15
+    # Precompute each page's links once, so every sample is drawn in
+    # constant time rather than by building the whole transition model
+    pages = list(corpus)
+    links = {page: list(corpus[page]) for page in pages}
 
-    transition_model_1 = {"1.html": 0.05, "2.html": 0.475, "3.html": 0.475}
-    """
     page_ranks = {page: 0 for page in corpus}
     # The first sample should be generated by choosing from a page at random
-    curr_page = random.choice(list(corpus))
+    curr_page = random.choice(pages)
     page_ranks[curr_page] += 1/n
 
     # collect n - 1 (remaining) samples
-    num_samples = n - 1
-    while num_samples:
-        # For each of the remaining samples, the next sample should be generated from 
-        # the previous sample based on the previous sample’s transition model
-        model = transition_model(corpus, curr_page, damping_factor)
-        pages = list(model.keys())
-        probabilities = list(model.values())
-        # pick next page based on the transition model probabilities
-        random_choice = random.choices(pages, probabilities)[0]
-        curr_page = random_choice
-        # increment the random choice
+    for _ in range(n - 1):
+        # With probability `damping_factor`, follow one of the page's links;
+        # otherwise, or if it has no links, go to any page at random.
+        # This draws from the same distribution as `transition_model`.
+        if links[curr_page] and random.random() < damping_factor:
+            curr_page = random.choice(links[curr_page])
+        else:
+            curr_page = random.choice(pages)
         page_ranks[curr_page] += 1/n
-        num_samples -= 1
     return page_ranks
 
 
-def iterate_pagerank(corpus, damping_factor):
+def batch_sample_pagerank(corpus, damping_factor, n):
+    """
+    Same as `sample_pagerank`, but samples with many random walks
+    at once using NumPy.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    return graph.to_dict(graph.sample(damping_factor, n))
+
+
+def iterate_pagerank(corpus, damping_factor, method="jacobi"):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until convergence, using one of the update
+    methods in `linkgraph.METHODS`.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    n = len(corpus)
-    # Begin by assigning each page a rank of 1 / N, where N is the total number of pages in the corpus.
-    page_ranks = {page: 1/n for page in corpus}
-    # Repeatedly calculate new rank values based on all of the current rank values
-    # (i.e., calculating a page’s PageRank based on the PageRanks of all pages that link to it).
-    
-    def calculate_ranks(p_ranks):
-        new_ranks = {}
-        total_diff = 0
-        for page in corpus:
-            rank = (1 - damping_factor) / n
-            for p, links in corpus.items():
-                if page in links:
-                    rank += damping_factor * p_ranks[p] / len(links)
-                elif not corpus[p]:
-                    # A page that has no links at all should be interpreted as having one link 
-                    # for every page in the corpus (including itself).
-                    rank += damping_factor * p_ranks[p] / n
-            new_ranks[page] = rank
-            total_diff += abs(p_ranks[page] - rank)
-
-        if total_diff <= 0.001:
-            return new_ranks
-        
-        return calculate_ranks(new_ranks)
-
-    return calculate_ranks(page_ranks)
+    # Build the link structure once, then update every page's rank
+    # together in a loop until the ranks stop changing
+    graph = LinkGraph.from_corpus(corpus)
+    ranks = graph.iterate(damping_factor, MARGIN, method=method)
+    return graph.to_dict(ranks)
+
+
+def personalized_pagerank(corpus, damping_factor, teleports):
+    """
+    Return personalized PageRank values for each teleport in `teleports`,
+    computed together over the same link structure.
+
+    Each teleport is either a dictionary mapping pages to weights, or a
+    collection of pages (such as the pages on one topic) to weigh equally.
+    Instead of a page chosen at random from all pages, the random surfer
+    jumps to a page chosen by those weights.
+
+    Return a list of dictionaries, one for each teleport, where keys are
+    page names and values are their PageRank values, summing to 1.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    index = {page: i for i, page in enumerate(graph.pages)}
+    weights = np.zeros((len(teleports), graph.n))
+    for row, teleport in zip(weights, teleports):
+        if not isinstance(teleport, dict):
+            teleport = dict.fromkeys(teleport, 1)
+        for page, weight in teleport.items():
+            row[index[page]] = weight
+    ranks = graph.personalized(weights, damping_factor, MARGIN)
+    return [graph.to_dict(row) for row in ranks]
 
 
 if __name__ == "__main__":